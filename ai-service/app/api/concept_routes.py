@@ -0,0 +1,14 @@
+from fastapi import APIRouter, HTTPException
+from app.models.schemas import ConceptBatchRequest, ConceptBatchResponse
+from app.core.config import CONCEPT_BATCH_MAX_TEXTS
+from app.services.concept_extraction import extract_concepts_batch
+
+router = APIRouter()
+
+@router.post("/batch", response_model=ConceptBatchResponse)
+def run_concept_batch(payload: ConceptBatchRequest):
+    """Re-extracts concepts for many stored texts (e.g. llmText) in one call."""
+    if len(payload.texts) > CONCEPT_BATCH_MAX_TEXTS:
+        raise HTTPException(status_code=413, detail=f"At most {CONCEPT_BATCH_MAX_TEXTS} texts per batch")
+
+    return {"concepts": extract_concepts_batch(payload.texts, top_n=payload.topN)}
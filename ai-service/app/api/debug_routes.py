@@ -0,0 +1,30 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from app.core.profiling import check_profile_secret, get_profile
+
+router = APIRouter()
+
+
+@router.get("/profiles/{profile_id}")
+def get_request_profile(
+    profile_id: str,
+    format: str = "json",
+    profile: Optional[str] = None,
+    x_profile: Optional[str] = Header(None),
+):
+    """
+    A stored request profile. ?format=folded returns the CPU samples as
+    folded stacks (for flamegraph.pl / speedscope).
+    """
+    if not check_profile_secret(x_profile or profile):
+        raise HTTPException(status_code=403, detail="Invalid profiling secret")
+
+    report = get_profile(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    if format == "folded":
+        return PlainTextResponse("\n".join(report["cpu"]["folded"]) + "\n")
+    return report
@@ -1,9 +1,241 @@
-from fastapi import APIRouter
-from app.models.schemas import OCRRequest, OCRResponse
-from app.services.ocr_service import process_document_ocr
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from app.models.schemas import OCRRequest, OCRResponse, OCRJobStatus, OCRBatchRequest
+from app.core.config import BATCH_MAX_ITEMS
+from app.services.ocr_service import (
+    process_document_ocr,
+    validate_file_type,
+    download_document,
+    lookup_cached,
+    project_result,
+    RESULT_FIELDS,
+)
+from app.services.ocr_stream import stream_document_ocr
+from app.services.downloader import DownloadError
+from app.core.metrics import start_request_timings, server_timing_header
+from app.core.admission import Overloaded, ocr_admission
+from app.core.profiling import ProfilerBusy, check_profile_secret, profile_request
+from app.services.page_engine import pages_inline
+from app.services.ocr_cache import cache_stats, invalidate
+from app.services.page_cache import page_cache
+from app.services.llm_cache import llm_cache, llm_cache_stats
+from app.services.gemini_refinement import gemini_status
+from app.services.ocr_jobs import job_queue
+from app.services.ocr_batch import run_ocr_batch
 
 router = APIRouter()
 
-@router.post("/", response_model=OCRResponse)
-def run_ocr(payload: OCRRequest):
-    return process_document_ocr(payload)
+
+def parse_fields(fields: Optional[str]):
+    """?fields=llmText,concepts → ["llmText", "concepts"] (None → every field)."""
+    if fields is None:
+        return None
+
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = sorted(set(names) - set(RESULT_FIELDS))
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)} (choose from {', '.join(RESULT_FIELDS)})",
+        )
+    return names
+
+
+@router.post("/", response_model=OCRResponse, response_model_exclude_unset=True)
+def run_ocr(
+    payload: OCRRequest,
+    response: Response,
+    include_timings: bool = False,
+    fields: Optional[str] = None,
+    page_text: bool = False,
+    profile: Optional[str] = None,
+    x_profile: Optional[str] = Header(None),
+):
+    """
+    ?fields=llmText,concepts returns only those fields; ?page_text=true
+    adds each page's text to "pages" (every page carries the offset and
+    length of its text in rawText either way).
+
+    Per-stage timings (ms) are returned in the Server-Timing header,
+    and in the body as "timings" with ?include_timings=true ("queue" is
+    the wait for an OCR slot).
+
+    429 with Retry-After when every OCR slot is busy and the wait queue
+    is full, or the document waited longer than OCR_MAX_QUEUE_WAIT.
+
+    With the profiling secret in the X-Profile header (or ?profile=),
+    the request runs under the sampling profiler and tracemalloc; the
+    X-Profile-Id header names the report at /debug/profiles/{id}.
+    """
+    selected = parse_fields(fields)
+    timings = start_request_timings()
+    secret = x_profile or profile
+    try:
+        if secret is None:
+            result = process_document_ocr(payload, shed_load=True)
+        else:
+            result = run_profiled(payload, secret, response)
+    except DownloadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except Overloaded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+    response.headers["Server-Timing"] = server_timing_header(timings)
+    result = project_result(result, selected, page_text)
+    if include_timings:
+        result = {**result, "timings": timings}
+    return result
+
+
+def run_profiled(payload: OCRRequest, secret: str, response: Response):
+    if not check_profile_secret(secret):
+        raise HTTPException(status_code=403, detail="Invalid profiling secret")
+
+    # Pages run in this thread while profiling: worker processes are
+    # invisible to the sampler and to tracemalloc
+    try:
+        with profile_request(f"{payload.fileType} {payload.fileUrl}") as info, pages_inline():
+            result = process_document_ocr(payload, shed_load=True)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    response.headers["X-Profile-Id"] = info["id"]
+    return result
+
+
+@router.post("/stream")
+def run_ocr_stream(payload: OCRRequest, format: str = "ndjson"):
+    """
+    Streams the document page by page (see ocr_stream.stream_document_ocr)
+    as NDJSON, or as server-sent events with ?format=sse. A cached
+    document is sent as a single "done" record holding the full result.
+
+    429 with Retry-After, before the stream starts, when every OCR slot
+    is busy and the wait queue is full; once streaming, pages wait for
+    a slot instead.
+    """
+    try:
+        validate_file_type(payload.fileType)
+        ocr_admission.check()
+        document = download_document(payload.fileUrl, payload.fileType)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except DownloadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except Overloaded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+    cached = lookup_cached(document.sha256, payload.fileType)
+    if cached is not None:
+        document.close()
+
+    async def records():
+        if cached is not None:
+            yield {"type": "done", "cached": True, "pages": len(cached["pages"]), "errors": 0, **cached}
+            return
+        async for record in stream_document_ocr(document, payload.fileType):
+            yield record
+
+    if format == "sse":
+        async def events():
+            async for record in records():
+                yield f"event: {record['type']}\ndata: {json.dumps(record)}\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    async def ndjson():
+        async for record in records():
+            yield json.dumps(record) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@router.post("/batch")
+async def run_ocr_batch_route(payload: OCRBatchRequest):
+    """Streams one NDJSON record per item, in completion order."""
+    if len(payload.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} items per batch")
+
+    async def ndjson():
+        async for record in run_ocr_batch(payload.items):
+            yield json.dumps(record) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@router.get("/cache")
+def get_cache_stats():
+    return cache_stats()
+
+
+@router.delete("/cache")
+def clear_cache(stale_only: bool = False):
+    return {"removed": invalidate(stale_only=stale_only)}
+
+
+@router.get("/page-cache")
+def get_page_cache_stats():
+    return page_cache.stats()
+
+
+@router.delete("/page-cache")
+def clear_page_cache():
+    return {"removed": page_cache.clear()}
+
+
+@router.get("/admission")
+def get_admission_stats():
+    return ocr_admission.stats()
+
+
+@router.get("/llm/status")
+def get_llm_status():
+    return gemini_status()
+
+
+@router.get("/llm/cache")
+def get_llm_cache_stats():
+    return llm_cache_stats()
+
+
+@router.delete("/llm/cache")
+def clear_llm_cache():
+    return {"removed": llm_cache.clear()}
+
+
+# ASYNC JOBS
+
+@router.post("/jobs", response_model=OCRJobStatus, status_code=202)
+def submit_ocr_job(payload: OCRRequest):
+    return job_queue.submit(payload)
+
+
+@router.get("/jobs/{job_id}", response_model=OCRJobStatus)
+def get_ocr_job(job_id: str):
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}/result", response_model=OCRResponse, response_model_exclude_unset=True)
+def get_ocr_job_result(job_id: str, fields: Optional[str] = None, page_text: bool = False):
+    """Same projection options as POST /ocr/."""
+    selected = parse_fields(fields)
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if job["status"] != "done":
+        raise HTTPException(
+            status_code=409,
+            detail={"status": job["status"], "stage": job["stage"], "error": job["error"]},
+        )
+
+    result = job_queue.get_result(job_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Job result expired")
+    return project_result(result, selected, page_text)
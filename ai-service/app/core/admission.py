@@ -0,0 +1,144 @@
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from app.core.config import (
+    WEB_CONCURRENCY,
+    OCR_MAX_CONCURRENT,
+    OCR_MAX_QUEUED,
+    OCR_MAX_QUEUE_WAIT,
+    OCR_NATIVE_THREADS,
+)
+from app.core.metrics import record_admission
+
+
+class Overloaded(Exception):
+    """No slot free and the wait queue is full (or the wait timed out)."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def limit_native_threads(threads: int = OCR_NATIVE_THREADS):
+    """
+    Caps the threads OpenMP (Tesseract) and OpenCV start per call. Must
+    run before Tesseract is first used; page workers and tesseract
+    subprocesses inherit the environment. Explicit env settings win.
+    """
+    os.environ.setdefault("OMP_THREAD_LIMIT", str(threads))
+    os.environ.setdefault("OMP_NUM_THREADS", str(threads))
+
+    import cv2
+
+    cv2.setNumThreads(threads)
+
+
+class AdmissionController:
+    """
+    At most `slots` documents run the guarded block at once. Callers that
+    shed load wait for a slot only while fewer than `max_queue` others
+    are waiting, and for at most `max_wait` seconds; otherwise they get
+    Overloaded with a Retry-After estimate. Internal callers (jobs,
+    batches) are already bounded by their own workers and just wait.
+    """
+
+    def __init__(self, slots: int, max_queue: int, max_wait: float):
+        self.slots = slots
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+
+        self._cond = threading.Condition()
+        self.running = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        # Moving average of how long a document holds its slot
+        self._hold_seconds = None
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free for a new arrival."""
+        if self._hold_seconds is None:
+            return 5
+        return max(1, math.ceil(self._hold_seconds * (self.waiting + 1) / self.slots))
+
+    def _reject(self, reason: str):
+        self.rejected += 1
+        record_admission(rejected=True)
+        raise Overloaded(reason, self.retry_after())
+
+    def check(self):
+        """Raises Overloaded right away if a new document would be turned down."""
+        with self._cond:
+            if self.running >= self.slots and self.waiting >= self.max_queue:
+                self._reject("OCR queue is full")
+
+    @contextmanager
+    def slot(self, shed_load: bool = False):
+        start = time.perf_counter()
+        with self._cond:
+            if self.running >= self.slots:
+                if shed_load and self.waiting >= self.max_queue:
+                    self._reject("OCR queue is full")
+
+                self.waiting += 1
+                record_admission(queued=1)
+                try:
+                    deadline = start + self.max_wait
+                    while self.running >= self.slots:
+                        timeout = deadline - time.perf_counter() if shed_load else None
+                        if timeout is not None and timeout <= 0:
+                            self._reject(f"No OCR slot free after {self.max_wait:.0f}s")
+                        self._cond.wait(timeout)
+                finally:
+                    self.waiting -= 1
+                    record_admission(queued=-1)
+
+            self.running += 1
+            self.admitted += 1
+
+        record_admission(running=1, wait=time.perf_counter() - start)
+        held_from = time.perf_counter()
+        try:
+            yield
+        finally:
+            held = time.perf_counter() - held_from
+            with self._cond:
+                self.running -= 1
+                self._hold_seconds = held if self._hold_seconds is None else 0.8 * self._hold_seconds + 0.2 * held
+                self._cond.notify()
+            record_admission(running=-1)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "slots": self.slots,
+                "running": self.running,
+                "waiting": self.waiting,
+                "maxQueued": self.max_queue,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "avgHoldSeconds": round(self._hold_seconds, 3) if self._hold_seconds is not None else None,
+                "retryAfter": self.retry_after(),
+            }
+
+
+def cpu_share() -> int:
+    """CPU cores each web worker process may keep busy: the admission slots and the page pool size both derive from it."""
+    return max(1, (os.cpu_count() or 1) // max(1, WEB_CONCURRENCY))
+
+
+def _default_slots() -> int:
+    if OCR_MAX_CONCURRENT > 0:
+        return OCR_MAX_CONCURRENT
+    return cpu_share()
+
+
+_slots = _default_slots()
+ocr_admission = AdmissionController(
+    _slots,
+    OCR_MAX_QUEUED if OCR_MAX_QUEUED > 0 else 4 * _slots,
+    OCR_MAX_QUEUE_WAIT,
+)
@@ -0,0 +1,173 @@
+import gzip
+import logging
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core.config import (
+    RESPONSE_COMPRESSION,
+    RESPONSE_COMPRESS_MIN_BYTES,
+    RESPONSE_GZIP_LEVEL,
+    RESPONSE_ZSTD_LEVEL,
+)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Already compressed, or must reach the client unbuffered
+EXCLUDED_CONTENT_TYPES = ("text/event-stream", "application/gzip", "application/zstd")
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses for clients that accept `encoding`. Whole
+    bodies are compressed in one go (with Content-Length); streamed
+    bodies are flushed chunk by chunk, so NDJSON records still arrive as
+    soon as they are sent. Subclasses supply the codec.
+    """
+
+    encoding = None
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    def compress(self, body: bytes) -> bytes:
+        raise NotImplementedError
+
+    def compress_chunk(self, stream, body: bytes, more_body: bool) -> bytes:
+        raise NotImplementedError
+
+    def new_stream(self):
+        raise NotImplementedError
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.encoding not in Headers(scope=scope).get("accept-encoding", ""):
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+        stream = None
+
+        async def send_compressed(message):
+            nonlocal start, passthrough, stream
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                media_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+                passthrough = (
+                    "content-encoding" in headers
+                    or message["status"] in (204, 206, 304)
+                    or media_type in EXCLUDED_CONTENT_TYPES
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    start = message
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if start is not None:
+                headers = MutableHeaders(raw=start["headers"])
+                headers.add_vary_header("Accept-Encoding")
+
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+
+                headers["Content-Encoding"] = self.encoding
+                if more_body:
+                    del headers["Content-Length"]
+                    stream = self.new_stream()
+                else:
+                    body = self.compress(body)
+                    headers["Content-Length"] = str(len(body))
+
+                await send(start)
+                start = None
+                if stream is None:
+                    await send({**message, "body": body})
+                    return
+
+            await send({**message, "body": self.compress_chunk(stream, body, more_body)})
+
+        await self.app(scope, receive, send_compressed)
+
+
+class ZstdMiddleware(CompressionMiddleware):
+    """zstd for clients that send Accept-Encoding: zstd."""
+
+    encoding = "zstd"
+
+    def __init__(self, app, minimum_size: int = 1024, level: int = 3):
+        super().__init__(app, minimum_size)
+        self.level = level
+
+    # A ZstdCompressor holds one compression context, so responses in
+    # flight at the same time must not share it
+    def compress(self, body: bytes) -> bytes:
+        return zstandard.ZstdCompressor(level=self.level).compress(body)
+
+    def new_stream(self):
+        return zstandard.ZstdCompressor(level=self.level).compressobj()
+
+    def compress_chunk(self, stream, body: bytes, more_body: bool) -> bytes:
+        if more_body:
+            return stream.compress(body) + stream.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return stream.compress(body) + stream.flush()
+
+
+class GzipMiddleware(CompressionMiddleware):
+    """
+    gzip for clients that send Accept-Encoding: gzip. Unlike Starlette's
+    GZipMiddleware, streamed chunks are sync-flushed instead of buffered
+    until the compressor fills.
+    """
+
+    encoding = "gzip"
+
+    def __init__(self, app, minimum_size: int = 1024, level: int = 6):
+        super().__init__(app, minimum_size)
+        self.level = level
+
+    def compress(self, body: bytes) -> bytes:
+        return gzip.compress(body, compresslevel=self.level)
+
+    def new_stream(self):
+        return zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress_chunk(self, stream, body: bytes, more_body: bool) -> bytes:
+        if more_body:
+            return stream.compress(body) + stream.flush(zlib.Z_SYNC_FLUSH)
+        return stream.compress(body) + stream.flush()
+
+
+def add_compression(app):
+    """
+    Installs response compression per RESPONSE_COMPRESSION. zstd sits
+    inside gzip: a client that accepts both gets zstd, and gzip leaves
+    bodies that already have a Content-Encoding alone.
+    """
+    if RESPONSE_COMPRESSION == "off":
+        return
+
+    if RESPONSE_COMPRESSION == "auto":
+        if zstandard is not None:
+            app.add_middleware(ZstdMiddleware, minimum_size=RESPONSE_COMPRESS_MIN_BYTES, level=RESPONSE_ZSTD_LEVEL)
+        else:
+            logger.info("zstandard not installed, compressing responses with gzip only")
+
+    app.add_middleware(GzipMiddleware, minimum_size=RESPONSE_COMPRESS_MIN_BYTES, level=RESPONSE_GZIP_LEVEL)
@@ -4,3 +4,167 @@ from dotenv import load_dotenv
 load_dotenv()
 
 TESSERACT_PATH = os.getenv("TESSERACT_PATH")
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# OCR page engine
+# 0 → CPU cores / WEB_CONCURRENCY worker processes (each web worker has
+# its own pool), 1 → run pages inline (no pool)
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "0"))
+OCR_PAGE_TIMEOUT = float(os.getenv("OCR_PAGE_TIMEOUT", "120"))
+# Pages submitted ahead of the one being collected (0 → 2x workers)
+OCR_MAX_IN_FLIGHT = int(os.getenv("OCR_MAX_IN_FLIGHT", "0"))
+
+# Admission control: documents in the CPU-heavy stages (extraction and
+# cleanup) at once, per web worker process (0 → CPU cores / WEB_CONCURRENCY)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+OCR_MAX_CONCURRENT = int(os.getenv("OCR_MAX_CONCURRENT", "0"))
+# Documents allowed to wait for a slot (0 → 4x slots); /ocr/ answers 429
+# beyond that, or once a document has waited OCR_MAX_QUEUE_WAIT seconds
+OCR_MAX_QUEUED = int(os.getenv("OCR_MAX_QUEUED", "0"))
+OCR_MAX_QUEUE_WAIT = float(os.getenv("OCR_MAX_QUEUE_WAIT", "60"))
+# Threads a single Tesseract / OpenCV call may use: documents and page
+# workers already fill the cores, so more only oversubscribes them
+OCR_NATIVE_THREADS = int(os.getenv("OCR_NATIVE_THREADS", "1"))
+
+# OCR backend: "auto" (tesserocr when installed, else pytesseract),
+# "tesserocr" (in-process engine, model loaded once per worker)
+# or "pytesseract" (one tesseract subprocess per page)
+OCR_BACKEND = os.getenv("OCR_BACKEND", "auto").lower()
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+
+# PDF rasterization
+PDF_DPI = int(os.getenv("PDF_DPI", "300"))
+PDF_RASTER_WINDOW = int(os.getenv("PDF_RASTER_WINDOW", "4"))
+
+# Native text-layer fast path for digital PDFs
+PDF_TEXT_LAYER = os.getenv("PDF_TEXT_LAYER", "true").lower() == "true"
+TEXT_LAYER_MIN_CHARS = int(os.getenv("TEXT_LAYER_MIN_CHARS", "20"))
+# Pages whose images cover more than this share of the page may be scans: their
+# text layer replaces OCR only if it has visible, mapped text outside the top and
+# bottom TEXT_LAYER_MARGIN of the page (where scanner headers and footers go)
+TEXT_LAYER_MAX_IMAGE_COVERAGE = float(os.getenv("TEXT_LAYER_MAX_IMAGE_COVERAGE", "0.5"))
+TEXT_LAYER_MARGIN = float(os.getenv("TEXT_LAYER_MARGIN", "0.1"))
+
+# OCR result cache
+OCR_CACHE_ENABLED = os.getenv("OCR_CACHE_ENABLED", "true").lower() == "true"
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", ".cache/ocr")
+OCR_CACHE_MAX_MB = int(os.getenv("OCR_CACHE_MAX_MB", "512"))
+# Change to force-invalidate every cached result
+OCR_CACHE_SALT = os.getenv("OCR_CACHE_SALT", "")
+
+# Page-level OCR cache: a page reuses the text of an earlier page with the
+# same pixels. Pages whose perceptual hash is within PAGE_CACHE_MAX_DISTANCE
+# bits (of 256) are candidates, reused only if a pixel check confirms them.
+# Each entry keeps the page at one bit per pixel (~40 KB)
+PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "true").lower() == "true"
+PAGE_CACHE_PATH = os.getenv("PAGE_CACHE_PATH", ".cache/pages.sqlite3")
+PAGE_CACHE_MAX_DISTANCE = int(os.getenv("PAGE_CACHE_MAX_DISTANCE", "40"))
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv("PAGE_CACHE_MAX_ENTRIES", "50000"))
+
+# Background OCR jobs
+OCR_JOB_WORKERS = int(os.getenv("OCR_JOB_WORKERS", "2"))
+OCR_JOB_DIR = os.getenv("OCR_JOB_DIR", ".cache/jobs")
+# Finished jobs are kept this long for result pickup
+OCR_JOB_RETENTION_HOURS = float(os.getenv("OCR_JOB_RETENTION_HOURS", "24"))
+# Unfinished jobs whose worker process has not renewed them for this long
+# are taken over by another one
+OCR_JOB_LEASE_SECONDS = float(os.getenv("OCR_JOB_LEASE_SECONDS", "60"))
+
+# Spell correction
+SPELL_PREFIX_LENGTH = int(os.getenv("SPELL_PREFIX_LENGTH", "6"))
+SPELL_CACHE_SIZE = int(os.getenv("SPELL_CACHE_SIZE", "50000"))
+
+# Image preprocessing
+# "fast": resolution-aware scaling, downsampled deskew, in-place buffers
+# "legacy": always upscale 2x (original pipeline)
+PREPROCESS_MODE = os.getenv("PREPROCESS_MODE", "fast").lower()
+OCR_TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", "300"))
+OCR_TARGET_GLYPH_PX = int(os.getenv("OCR_TARGET_GLYPH_PX", "28"))
+# Pre-pass after binarization: skip blank pages and crop to the text
+# blocks (off → fixed 2% border crop)
+OCR_PAGE_ROI = os.getenv("OCR_PAGE_ROI", "true").lower() == "true"
+# Pages whose text blocks hold less ink than this fraction of the page are blank
+OCR_BLANK_INK_RATIO = float(os.getenv("OCR_BLANK_INK_RATIO", "0.0002"))
+
+# Batch OCR pipeline (per-stage concurrency and queue bound)
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+BATCH_DOWNLOAD_CONCURRENCY = int(os.getenv("BATCH_DOWNLOAD_CONCURRENCY", "8"))
+BATCH_OCR_CONCURRENCY = int(os.getenv("BATCH_OCR_CONCURRENCY", "2"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+BATCH_CONCEPT_CONCURRENCY = int(os.getenv("BATCH_CONCEPT_CONCURRENCY", "1"))
+BATCH_QUEUE_SIZE = int(os.getenv("BATCH_QUEUE_SIZE", "4"))
+
+# Page-streamed pipeline (/ocr/stream): pages refined by Gemini at once,
+# and pages buffered between stages
+STREAM_LLM_CONCURRENCY = int(os.getenv("STREAM_LLM_CONCURRENCY", "2"))
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "4"))
+
+# Gemini refinement
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash-preview-09-2025")
+GEMINI_CHUNK_CHARS = int(os.getenv("GEMINI_CHUNK_CHARS", "12000"))
+GEMINI_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "4"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "5"))
+# Shared quota for the whole process
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "60"))
+GEMINI_TPM = float(os.getenv("GEMINI_TPM", "1000000"))
+# Give up (fall back to cleaned text) rather than queue longer than this
+GEMINI_MAX_QUEUE_WAIT = float(os.getenv("GEMINI_MAX_QUEUE_WAIT", "30"))
+GEMINI_BREAKER_FAILURES = int(os.getenv("GEMINI_BREAKER_FAILURES", "5"))
+GEMINI_BREAKER_COOLDOWN = float(os.getenv("GEMINI_BREAKER_COOLDOWN", "60"))
+
+# LLM refinement policy for OCR'd pages: "always" sends every page to
+# Gemini, "confidence" only the pages Tesseract read poorly (confidently
+# read scans keep their cleaned text)
+LLM_POLICY = os.getenv("LLM_POLICY", "confidence").lower()
+# Digital text-layer pages are restructured (headings, bullets) by Gemini
+# regardless of LLM_POLICY unless this is off
+LLM_REFINE_TEXT_LAYER = os.getenv("LLM_REFINE_TEXT_LAYER", "true").lower() == "true"
+# Mean word confidence (0-100) below which a page is refined
+LLM_MIN_CONFIDENCE = float(os.getenv("LLM_MIN_CONFIDENCE", "80"))
+# ...or when more than this fraction of its words are below LLM_LOW_CONF_WORD
+LLM_LOW_CONF_WORD = float(os.getenv("LLM_LOW_CONF_WORD", "60"))
+LLM_MAX_LOW_CONF_RATIO = float(os.getenv("LLM_MAX_LOW_CONF_RATIO", "0.1"))
+
+# LLM response cache (shared by Gemini and OpenAI refinement)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", ".cache/llm")
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "256"))
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", "720"))
+
+# Warm-up: models preloaded before the worker reports ready
+# "background" (default), "blocking" (delay startup) or "off"
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "background").lower()
+WARMUP_MODELS = [m.strip() for m in os.getenv("WARMUP_MODELS", "spacy,spell,nltk,gemini").split(",") if m.strip()]
+
+# Opt-in request profiling (X-Profile header or ?profile=, must equal the
+# secret); disabled while PROFILE_SECRET is empty
+PROFILE_SECRET = os.getenv("PROFILE_SECRET", "")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_TOP_ALLOCATIONS = int(os.getenv("PROFILE_TOP_ALLOCATIONS", "25"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", ".cache/profiles")
+PROFILE_MAX_MB = int(os.getenv("PROFILE_MAX_MB", "64"))
+PROFILE_TTL_HOURS = float(os.getenv("PROFILE_TTL_HOURS", "72"))
+
+# Response compression for large bodies: "auto" (zstd for clients that
+# accept it when the zstandard package is installed, gzip otherwise),
+# "gzip" or "off"
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "auto").lower()
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+RESPONSE_ZSTD_LEVEL = int(os.getenv("RESPONSE_ZSTD_LEVEL", "3"))
+
+# Concept extraction (spaCy)
+SPACY_EXCLUDE = [c.strip() for c in os.getenv("SPACY_EXCLUDE", "ner").split(",") if c.strip()]
+SPACY_BATCH_SIZE = int(os.getenv("SPACY_BATCH_SIZE", "32"))
+SPACY_N_PROCESS = int(os.getenv("SPACY_N_PROCESS", "1"))
+CONCEPT_BATCH_MAX_TEXTS = int(os.getenv("CONCEPT_BATCH_MAX_TEXTS", "500"))
+
+# File downloads (shared pooled HTTP session)
+DOWNLOAD_MAX_MB = float(os.getenv("DOWNLOAD_MAX_MB", "100"))
+DOWNLOAD_TIMEOUT = float(os.getenv("DOWNLOAD_TIMEOUT", "60"))
+DOWNLOAD_CHUNK_KB = int(os.getenv("DOWNLOAD_CHUNK_KB", "256"))
+DOWNLOAD_POOL_SIZE = int(os.getenv("DOWNLOAD_POOL_SIZE", "16"))
+DOWNLOAD_RETRIES = int(os.getenv("DOWNLOAD_RETRIES", "2"))
+# Where downloads are spooled (defaults to the system temp dir)
+DOWNLOAD_TMP_DIR = os.getenv("DOWNLOAD_TMP_DIR") or None
@@ -0,0 +1,160 @@
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+# Pipeline stages, in the order a document goes through them
+STAGES = [
+    "download",
+    "text_layer",
+    "rasterize",
+    "preprocess",
+    "ocr",
+    "spell",
+    "sentences",
+    "llm",
+    "concepts",
+]
+
+STAGE_SECONDS = Histogram(
+    "ai_stage_duration_seconds",
+    "Time spent in each pipeline stage (per document, per page for rasterize/preprocess/ocr)",
+    ["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+STAGE_ERRORS = Counter("ai_stage_errors_total", "Failures in each pipeline stage", ["stage"])
+STAGE_BYTES = Counter("ai_stage_bytes_total", "Bytes (downloads) or characters (text stages) processed", ["stage"])
+STAGE_PAGES = Counter("ai_stage_pages_total", "Pages processed by each page-level stage", ["stage"])
+CACHE_LOOKUPS = Counter("ai_cache_lookups_total", "Cache lookups by cache and result", ["cache", "result"])
+LLM_DECISIONS = Counter("ai_llm_pages_total", "Pages sent to (refine) or kept from (skip) LLM refinement", ["decision"])
+
+# Admission control in front of the OCR pipeline
+ADMISSION_RUNNING = Gauge("ai_ocr_running", "Documents holding an OCR slot", multiprocess_mode="livesum")
+ADMISSION_QUEUED = Gauge("ai_ocr_queued", "Documents waiting for an OCR slot", multiprocess_mode="livesum")
+ADMISSION_WAIT = Histogram(
+    "ai_ocr_queue_wait_seconds",
+    "Time documents waited for an OCR slot",
+    buckets=(0.001, 0.01, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+ADMISSION_REJECTED = Counter("ai_ocr_rejected_total", "Documents turned away with 429 (queue full or wait timed out)")
+
+# Export every stage from the start, not only once it has run
+for _stage in STAGES:
+    STAGE_SECONDS.labels(_stage)
+    STAGE_ERRORS.labels(_stage)
+
+# Timing breakdown (ms per stage) of the request being served, if any
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def start_request_timings() -> dict:
+    """
+    Starts collecting a per-request breakdown in the current context.
+    The dict is shared with every thread/task the request spawns, since
+    they inherit the context.
+    """
+    timings = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def request_timings():
+    """Breakdown (ms per stage) of the current request, or None outside a request."""
+    return _request_timings.get()
+
+
+def record_stage(stage: str, seconds: float, pages: int = 0, size: int = 0):
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    if pages:
+        STAGE_PAGES.labels(stage).inc(pages)
+    if size:
+        STAGE_BYTES.labels(stage).inc(size)
+
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = round(timings.get(stage, 0.0) + seconds * 1000, 2)
+
+
+def record_error(stage: str):
+    STAGE_ERRORS.labels(stage).inc()
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_llm_decision(decision: str):
+    LLM_DECISIONS.labels(decision).inc()
+
+
+def record_admission(running: int = 0, queued: int = 0, wait: float = None, rejected: bool = False):
+    if running:
+        ADMISSION_RUNNING.inc(running)
+    if queued:
+        ADMISSION_QUEUED.inc(queued)
+    if rejected:
+        ADMISSION_REJECTED.inc()
+    if wait is not None:
+        ADMISSION_WAIT.observe(wait)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings["queue"] = round(timings.get("queue", 0.0) + wait * 1000, 2)
+
+
+@contextmanager
+def track_stage(stage: str, pages: int = 0, size: int = 0):
+    """
+    Times the block as `stage`; an exception counts as a stage error.
+    Yields a dict where the block can fill in "pages"/"size" once known.
+    """
+    counts = {"pages": pages, "size": size}
+    start = time.perf_counter()
+    try:
+        yield counts
+    except Exception:
+        record_error(stage)
+        raise
+    finally:
+        record_stage(stage, time.perf_counter() - start, counts["pages"], counts["size"])
+
+
+def record_page_timings(timings: dict):
+    """
+    Records one OCR'd page from the timings its worker sent back
+    (workers are separate processes, so they can't record metrics themselves).
+    """
+    ocr_ms = timings.get("ocr")
+    preprocess_ms = sum(v for k, v in timings.items() if k != "ocr")
+
+    record_stage("preprocess", preprocess_ms / 1000, pages=1)
+    if ocr_ms is not None:
+        record_stage("ocr", ocr_ms / 1000, pages=1)
+
+
+def server_timing_header(timings: dict) -> str:
+    """Server-Timing header value (shown per stage in browser dev tools)."""
+    return ", ".join(f"{stage};dur={ms}" for stage, ms in timings.items())
+
+
+def render_metrics():
+    """Returns (body, content type) for the /metrics endpoint."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # gunicorn with several workers: merge every worker's metrics
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,192 @@
+import hmac
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+
+from app.core.config import (
+    PROFILE_SECRET,
+    PROFILE_INTERVAL_MS,
+    PROFILE_TOP_ALLOCATIONS,
+    PROFILE_DIR,
+    PROFILE_MAX_MB,
+    PROFILE_TTL_HOURS,
+)
+from app.utils.disk_cache import DiskCache
+
+logger = logging.getLogger(__name__)
+
+
+profile_store = DiskCache(PROFILE_DIR, PROFILE_MAX_MB * 1024 * 1024, ttl=PROFILE_TTL_HOURS * 3600)
+
+PROFILE_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+# tracemalloc is process-wide, so only one request is profiled at a time
+_profile_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def check_profile_secret(value) -> bool:
+    """True only when profiling is configured and value matches the secret."""
+    if not PROFILE_SECRET or value is None:
+        return False
+    return hmac.compare_digest(value.encode("utf-8"), PROFILE_SECRET.encode("utf-8"))
+
+
+def _short_path(path: str) -> str:
+    cwd = os.getcwd()
+    if path.startswith(cwd):
+        return os.path.relpath(path, cwd)
+    marker = "site-packages" + os.sep
+    if marker in path:
+        return path.split(marker, 1)[1]
+    return os.path.basename(path)
+
+
+class SamplingProfiler:
+    """
+    Samples one thread's Python stack every `interval` seconds from a
+    background thread (sys._current_frames), so the profiled code runs
+    unmodified. Stacks are kept folded ("a;b;c" → samples), the format
+    flame graph tools read.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{_short_path(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def report(self, top: int = 30) -> dict:
+        self_samples = Counter()
+        total_samples = Counter()
+        for stack, n in self.stacks.items():
+            frames = stack.split(";")
+            self_samples[frames[-1]] += n
+            for name in set(frames):
+                total_samples[name] += n
+
+        def ranked(counter):
+            return [
+                {"function": name, "samples": n, "percent": round(100 * n / self.samples, 1)}
+                for name, n in counter.most_common(top)
+            ]
+
+        return {
+            "samples": self.samples,
+            "intervalMs": self.interval * 1000,
+            "topSelf": ranked(self_samples),
+            "topTotal": ranked(total_samples),
+            "folded": [f"{stack} {n}" for stack, n in self.stacks.most_common()],
+        }
+
+
+def top_allocations(snapshot, limit: int) -> list:
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ])
+    return [
+        {
+            "site": f"{_short_path(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+            "sizeKiB": round(stat.size / 1024, 1),
+            "count": stat.count,
+        }
+        for stat in snapshot.statistics("lineno")[:limit]
+    ]
+
+
+@contextmanager
+def profile_request(label: str):
+    """
+    Profiles the block on the calling thread: sampled CPU stacks plus
+    tracemalloc allocation sites. The report is stored in profile_store
+    on exit (also when the block raises); the yielded dict holds its "id".
+    Raises ProfilerBusy if another request is being profiled.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy("Another request is being profiled")
+
+    info = {"id": uuid.uuid4().hex}
+    profiler = SamplingProfiler(threading.get_ident(), PROFILE_INTERVAL_MS / 1000)
+    started_tracing = not tracemalloc.is_tracing()
+    error = None
+
+    try:
+        if started_tracing:
+            tracemalloc.start()
+        else:
+            tracemalloc.reset_peak()
+
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            yield info
+        except Exception as e:
+            error = repr(e)
+            raise
+        finally:
+            profiler.stop()
+            wall = time.perf_counter() - start
+
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+
+            report = {
+                "id": info["id"],
+                "label": label,
+                "createdAt": time.time(),
+                "wallSeconds": round(wall, 3),
+                "error": error,
+                "cpu": profiler.report(),
+                "memory": {
+                    "peakMiB": round(peak / 2 ** 20, 2),
+                    "currentMiB": round(current / 2 ** 20, 2),
+                    "topAllocations": top_allocations(snapshot, PROFILE_TOP_ALLOCATIONS),
+                },
+            }
+            try:
+                profile_store.set(info["id"], report)
+                logger.info(f"Stored profile {info['id']} ({label}, {wall:.1f}s)")
+            except OSError as e:
+                logger.warning(f"Could not store profile {info['id']}: {e}")
+    finally:
+        _profile_lock.release()
+
+
+def get_profile(profile_id: str):
+    if not PROFILE_ID_RE.match(profile_id):
+        return None
+    return profile_store.get(profile_id)
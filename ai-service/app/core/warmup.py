@@ -0,0 +1,108 @@
+import logging
+import threading
+import time
+
+from app.core.config import WARMUP_MODELS
+
+logger = logging.getLogger(__name__)
+
+
+def _warm_spacy():
+    from app.services.concept_extraction import get_nlp
+    get_nlp()
+
+
+def _warm_spell():
+    from app.services.text_refinement import get_spell_index
+    get_spell_index()
+
+
+def _warm_nltk():
+    from app.services.text_refinement import load_sentence_tokenizer
+    load_sentence_tokenizer()
+
+
+def _warm_gemini():
+    from app.services.gemini_refinement import get_client
+    get_client()
+
+
+WARMUP_STEPS = {
+    "spacy": _warm_spacy,
+    "spell": _warm_spell,
+    "nltk": _warm_nltk,
+    "gemini": _warm_gemini,
+}
+
+
+_state = {
+    "status": "pending",  # pending → warming → ready
+    "steps": {},
+    "startedAt": None,
+    "finishedAt": None,
+}
+_lock = threading.Lock()
+
+
+def warm_up(models: list = None) -> dict:
+    """
+    Loads the configured models/SDKs into this process.
+    Safe to call more than once: loaders are memoized, so a forked
+    worker whose parent already warmed up finishes instantly.
+    A failing step is recorded but does not block readiness;
+    that component loads lazily on first request instead.
+    """
+    models = WARMUP_MODELS if models is None else models
+
+    with _lock:
+        if _state["status"] == "warming":
+            return _state
+        _state["status"] = "warming"
+        _state["startedAt"] = time.time()
+
+    for name in models:
+        step = WARMUP_STEPS.get(name)
+        if step is None:
+            logger.warning(f"Unknown warm-up step: {name}")
+            continue
+
+        start = time.perf_counter()
+        try:
+            step()
+            result = {"status": "ok"}
+        except Exception as e:
+            logger.warning(f"Warm-up of {name} failed: {e}")
+            result = {"status": "failed", "error": str(e)}
+        result["seconds"] = round(time.perf_counter() - start, 3)
+
+        with _lock:
+            _state["steps"][name] = result
+
+    with _lock:
+        _state["status"] = "ready"
+        _state["finishedAt"] = time.time()
+
+    logger.info(f"Warm-up finished: {_state['steps']}")
+    return _state
+
+
+def warm_up_in_background():
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+
+def mark_ready():
+    """Used when warm-up is disabled: ready as soon as the app is up."""
+    with _lock:
+        if _state["status"] == "pending":
+            _state["status"] = "ready"
+            _state["finishedAt"] = time.time()
+
+
+def warmup_state() -> dict:
+    with _lock:
+        return {**_state, "steps": dict(_state["steps"])}
+
+
+def is_ready() -> bool:
+    with _lock:
+        return _state["status"] == "ready"
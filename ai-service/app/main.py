@@ -1,8 +1,23 @@
-from fastapi import FastAPI
+import logging
+
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
 from app.api.ocr_routes import router as ocr_router
+from app.api.concept_routes import router as concept_router
+from app.api.debug_routes import router as debug_router
+from app.services.ocr_jobs import job_queue
+from app.core.config import WARMUP_ON_STARTUP, LOG_LEVEL
+from app.core.metrics import render_metrics
+from app.core.compression import add_compression
+from app.core.warmup import warm_up, warm_up_in_background, mark_ready, warmup_state, is_ready
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime
 
+logging.basicConfig(
+    level=LOG_LEVEL,
+    format="%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s",
+)
+
 app = FastAPI(
     title="LMS AI Service",
     description="OCR and NLP microservice for LMS",
@@ -17,6 +32,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ✅ Response compression (zstd / gzip) for large bodies
+add_compression(app)
+
+# ✅ Warm-up: preload models before reporting ready
+@app.on_event("startup")
+def start_warm_up():
+    if WARMUP_ON_STARTUP == "blocking":
+        warm_up()
+    elif WARMUP_ON_STARTUP == "background":
+        warm_up_in_background()
+    else:
+        mark_ready()
+
+# ✅ Resume queued OCR jobs and start the job workers
+@app.on_event("startup")
+def start_job_queue():
+    job_queue.start()
+
 # ✅ Root route (GET + HEAD)
 @app.api_route("/", methods=["GET", "HEAD"])
 def root():
@@ -26,15 +59,39 @@ def root():
         "timestamp": datetime.utcnow().isoformat()
     }
 
-# ✅ Health check route (GET + HEAD)
+# ✅ Health check route (GET + HEAD) — liveness, answers as soon as the process is up
 @app.api_route("/health", methods=["GET", "HEAD"])
 def health():
     return {
         "status": "ok",
         "timestamp": datetime.utcnow().isoformat()
     }
-    
-    
+
+# ✅ Readiness route (GET + HEAD) — 503 until warm-up has finished
+@app.api_route("/ready", methods=["GET", "HEAD"])
+def ready():
+    state = warmup_state()
+    return JSONResponse(
+        status_code=200 if is_ready() else 503,
+        content={
+            **state,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    )
+
+
+# ✅ Prometheus metrics (per-stage latency, pages, bytes, errors, cache hits)
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 
 # ✅ OCR Router
-app.include_router(ocr_router, prefix="/ocr", tags=["OCR"])
\ No newline at end of file
+app.include_router(ocr_router, prefix="/ocr", tags=["OCR"])
+
+# ✅ Concepts Router
+app.include_router(concept_router, prefix="/concepts", tags=["Concepts"])
+
+# ✅ Debug Router (request profiles, needs PROFILE_SECRET)
+app.include_router(debug_router, prefix="/debug", tags=["Debug"], include_in_schema=False)
@@ -1,11 +1,62 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 class OCRRequest(BaseModel):
     fileUrl: str
     fileType: str  # "pdf" or "image"
 
+class OCRBatchRequest(BaseModel):
+    items: list[OCRRequest]
+
+class PageConfidence(BaseModel):
+    words: int
+    mean: Optional[float] = None  # mean word confidence, 0-100
+    lowRatio: Optional[float] = None  # share of words below LLM_LOW_CONF_WORD
+
+class PageInfo(BaseModel):
+    page: int
+    method: str  # "text_layer" or "ocr"
+    error: Optional[str] = None
+    timings: Optional[dict[str, float]] = None  # ms per preprocessing/OCR step
+    blank: Optional[bool] = None  # no text found, OCR skipped
+    crop: Optional[list[float]] = None  # OCR'd region: [left, top, right, bottom] as page fractions
+    pageCache: Optional[str] = None  # "hit": text reused from the same earlier page, "miss"
+    confidence: Optional[PageConfidence] = None  # Tesseract word confidences (OCR'd pages)
+    llm: Optional[str] = None  # LLM policy decision: "refine" or "skip"
+    offset: Optional[int] = None  # where the page's text starts in rawText
+    length: Optional[int] = None  # length of the page's text
+    text: Optional[str] = None  # the page's text, with ?page_text=true
+
+class LLMReport(BaseModel):
+    policy: str  # LLM_POLICY: "always" or "confidence"
+    refinedPages: list[int]
+    skippedPages: list[int]
+    meanConfidence: Optional[float] = None
+    fallbackChunks: int = 0  # chunks that kept their cleaned text because Gemini failed
+
+# Fields are optional because callers can project them (?fields=llmText,concepts)
 class OCRResponse(BaseModel):
-    rawText: str
-    cleanedText: str
-    llmText: str
-    concepts: list[str]
+    rawText: Optional[str] = None
+    cleanedText: Optional[str] = None
+    llmText: Optional[str] = None
+    concepts: Optional[list[str]] = None
+    pages: list[PageInfo] = []
+    llm: Optional[LLMReport] = None  # which pages went to Gemini, and why
+    timings: Optional[dict[str, float]] = None  # ms per pipeline stage, with ?include_timings=true
+
+class OCRJobStatus(BaseModel):
+    jobId: str
+    status: str  # "queued", "running", "done" or "failed"
+    stage: Optional[str] = None
+    stages: dict[str, str]  # stage → "pending", "running" or "done"
+    error: Optional[str] = None
+    createdAt: float
+    updatedAt: float
+
+class ConceptBatchRequest(BaseModel):
+    texts: list[str]
+    topN: int = 15
+
+class ConceptBatchResponse(BaseModel):
+    concepts: list[list[str]]
@@ -1,8 +1,25 @@
 import re
-import spacy
+import threading
 from collections import Counter
 
-nlp = spacy.load("en_core_web_sm")
+from app.core.config import SPACY_EXCLUDE, SPACY_BATCH_SIZE, SPACY_N_PROCESS
+from app.core.metrics import track_stage
+
+_nlp = None
+_nlp_lock = threading.Lock()
+
+
+def get_nlp():
+    """Loads the spaCy model on first use (or during warm-up)."""
+    global _nlp
+    with _nlp_lock:
+        if _nlp is None:
+            import spacy
+
+            # Only noun_chunks, is_stop and lemma_ are used:
+            # NER (and anything else in SPACY_EXCLUDE) is never loaded
+            _nlp = spacy.load("en_core_web_sm", exclude=SPACY_EXCLUDE)
+        return _nlp
 
 
 STOP_CONCEPTS = {
@@ -21,31 +38,52 @@ STOP_CONCEPTS = {
 }
 
 
+# Patterns are compiled once; they run for every candidate phrase
+TABLE_PIPE_RE = re.compile(r"\|")
+TABLE_RULE_RE = re.compile(r":?-{2,}:?")
+INLINE_SPACE_RE = re.compile(r"[^\S\n]+")
+WHITESPACE_RE = re.compile(r"\s+")
+
+HEADING_RE = re.compile(r"\s{0,3}#{1,4}\s+(.+)")
+BULLET_RE = re.compile(r"\s*[-•→]+\s*(.+)")
+BOLD_RE = re.compile(r"\*\*(.+?)\*\*")
+COLON_TITLE_RE = re.compile(r"([A-Za-z][A-Za-z0-9\s\-]{3,50})\s*:")
+
+HAS_LETTER_RE = re.compile(r"[a-zA-Z]")
+GARBAGE_RE = re.compile(r"[\\_/{}()\[\]]")
+MOSTLY_NUMBERS_RE = re.compile(r"[0-9\s\-]+")
+MARKDOWN_RE = re.compile(r"[*_`]+")
+NUMBERING_RE = re.compile(r"^\d+[\.\)]\s*")
+TRAILING_COLON_RE = re.compile(r":$")
+EXTRA_SYMBOLS_RE = re.compile(r"[^a-zA-Z0-9\s\-]")
+
+
 def clean_text(text: str) -> str:
     # remove table pipes & markdown separators
-    text = re.sub(r"\|", " ", text)
-    text = re.sub(r":?-{2,}:?", " ", text)
+    text = TABLE_PIPE_RE.sub(" ", text)
+    text = TABLE_RULE_RE.sub(" ", text)
 
-    # normalize spaces
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+    # normalize spaces, but keep line breaks: headings and
+    # bullets are only recognisable at the start of a line
+    lines = (INLINE_SPACE_RE.sub(" ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
 
 
 def is_valid_concept(phrase: str) -> bool:
     phrase = phrase.strip()
 
-    if not re.search(r"[a-zA-Z]", phrase):
+    if not HAS_LETTER_RE.search(phrase):
         return False
 
     if len(phrase) < 4 or len(phrase) > 50:
         return False
 
     # remove garbage symbols
-    if re.search(r"[\\_/{}()\[\]]", phrase):
+    if GARBAGE_RE.search(phrase):
         return False
 
     # remove mostly numbers
-    if re.fullmatch(r"[0-9\s\-]+", phrase):
+    if MOSTLY_NUMBERS_RE.fullmatch(phrase):
         return False
 
     # remove stop concepts
@@ -64,16 +102,16 @@ def add_concept(concepts, seen, phrase):
     phrase = phrase.strip()
 
     # remove markdown symbols
-    phrase = re.sub(r"[*_`]+", "", phrase).strip()
+    phrase = MARKDOWN_RE.sub("", phrase).strip()
 
     # remove numbering like "1. HR Planning"
-    phrase = re.sub(r"^\d+[\.\)]\s*", "", phrase)
+    phrase = NUMBERING_RE.sub("", phrase)
 
     # remove colon at end
-    phrase = re.sub(r":$", "", phrase).strip()
+    phrase = TRAILING_COLON_RE.sub("", phrase).strip()
 
     # remove extra symbols
-    phrase = re.sub(r"[^a-zA-Z0-9\s\-]", "", phrase).strip()
+    phrase = EXTRA_SYMBOLS_RE.sub("", phrase).strip()
 
     if not is_valid_concept(phrase):
         return
@@ -84,10 +122,40 @@ def add_concept(concepts, seen, phrase):
         concepts.append(phrase)
 
 
-def extract_concepts(text: str, top_n: int = 15) -> list:
+def scan_candidates(text: str):
     """
-    Works best with llmText, but also works with cleanedText.
-    Returns only a few meaningful concepts.
+    One pass over the lines of cleaned text.
+    Returns (headings, bold, bullets, colon_titles) in document order.
+    """
+    headings, bold, bullets, colon_titles = [], [], [], []
+
+    for line in text.split("\n"):
+        # ✅ 1) Markdown headings
+        if "#" in line:
+            m = HEADING_RE.fullmatch(line)
+            if m:
+                headings.append(m.group(1))
+
+        # ✅ 2) Bold concepts
+        if "**" in line:
+            bold.extend(BOLD_RE.findall(line))
+
+        # ✅ 3) Bullet titles (only short, concept-like ones)
+        m = BULLET_RE.fullmatch(line)
+        if m and len(m.group(1)) <= 60:
+            bullets.append(m.group(1))
+
+        # ✅ 4) Lines ending with ":" (often headings in notes)
+        if ":" in line:
+            colon_titles.extend(COLON_TITLE_RE.findall(line))
+
+    return headings, bold, bullets, colon_titles
+
+
+def collect_candidates(text: str):
+    """
+    Structural candidates (headings, bold, bullets, colon titles).
+    Returns (concepts, seen, text for spaCy).
     """
 
     text = clean_text(text)
@@ -95,34 +163,17 @@ def extract_concepts(text: str, top_n: int = 15) -> list:
     concepts = []
     seen = set()
 
-    # ✅ 1) Markdown headings
-    heading_matches = re.findall(r"^\s{0,3}#{1,4}\s+(.+)$", text, flags=re.MULTILINE)
-    for h in heading_matches:
-        add_concept(concepts, seen, h)
-
-    # ✅ 2) Bold concepts
-    bold_matches = re.findall(r"\*\*(.+?)\*\*", text)
-    for b in bold_matches:
-        add_concept(concepts, seen, b)
-
-    # ✅ 3) Bullet titles
-    bullet_matches = re.findall(r"^\s*[-•→]+\s*(.+)$", text, flags=re.MULTILINE)
-    for line in bullet_matches:
-        # take only short bullet phrases (concept-like)
-        if len(line) <= 60:
-            add_concept(concepts, seen, line)
-
-    # ✅ 4) Lines ending with ":" (often headings in notes)
-    colon_matches = re.findall(r"([A-Za-z][A-Za-z0-9\s\-]{3,50})\s*:", text)
-    for c in colon_matches:
-        add_concept(concepts, seen, c)
-
-    # If already enough, return
-    if len(concepts) >= top_n:
-        return concepts[:top_n]
+    # Added bucket by bucket so headings still outrank bold text,
+    # bullets and colon titles
+    for bucket in scan_candidates(text):
+        for phrase in bucket:
+            add_concept(concepts, seen, phrase)
 
-    # ✅ 5) Fallback: spaCy noun chunks (highly filtered)
-    doc = nlp(text)
+    return concepts, seen, WHITESPACE_RE.sub(" ", text)
+
+
+def add_noun_chunk_concepts(doc, concepts: list, seen: set, top_n: int):
+    """✅ 5) Fallback: spaCy noun chunks (highly filtered)"""
     counter = Counter()
 
     for chunk in doc.noun_chunks:
@@ -131,7 +182,7 @@ def extract_concepts(text: str, top_n: int = 15) -> list:
         if all(tok.is_stop for tok in chunk):
             continue
 
-        phrase_clean = re.sub(r"[^a-zA-Z0-9\s\-]", "", phrase).strip()
+        phrase_clean = EXTRA_SYMBOLS_RE.sub("", phrase).strip()
 
         if is_valid_concept(phrase_clean):
             lemma_phrase = " ".join(
@@ -148,4 +199,50 @@ def extract_concepts(text: str, top_n: int = 15) -> list:
         if len(concepts) >= top_n:
             break
 
-    return concepts[:top_n]
+
+def extract_concepts(text: str, top_n: int = 15) -> list:
+    """
+    Works best with llmText, but also works with cleanedText.
+    Returns only a few meaningful concepts.
+    """
+    with track_stage("concepts", size=len(text)):
+        concepts, seen, text = collect_candidates(text)
+
+        # If already enough, return
+        if len(concepts) >= top_n:
+            return concepts[:top_n]
+
+        add_noun_chunk_concepts(get_nlp()(text), concepts, seen, top_n)
+
+        return concepts[:top_n]
+
+
+def extract_concepts_batch(
+    texts: list[str],
+    top_n: int = 15,
+    batch_size: int = SPACY_BATCH_SIZE,
+    n_process: int = SPACY_N_PROCESS,
+) -> list[list]:
+    """
+    Same output as [extract_concepts(t, top_n) for t in texts], but the
+    texts that need the spaCy fallback go through nlp.pipe together.
+    """
+    with track_stage("concepts", size=sum(len(t) for t in texts)):
+        return _extract_concepts_batch(texts, top_n, batch_size, n_process)
+
+
+def _extract_concepts_batch(texts: list[str], top_n: int, batch_size: int, n_process: int) -> list[list]:
+    results = [collect_candidates(text) for text in texts]
+
+    needs_nlp = [i for i, (concepts, _, _) in enumerate(results) if len(concepts) < top_n]
+    if needs_nlp:
+        docs = get_nlp().pipe(
+            (results[i][2] for i in needs_nlp),
+            batch_size=batch_size,
+            n_process=n_process,
+        )
+        for i, doc in zip(needs_nlp, docs):
+            concepts, seen, _ = results[i]
+            add_noun_chunk_concepts(doc, concepts, seen, top_n)
+
+    return [concepts[:top_n] for concepts, _, _ in results]
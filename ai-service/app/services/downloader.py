@@ -0,0 +1,161 @@
+import hashlib
+import tempfile
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.core.config import (
+    DOWNLOAD_MAX_MB,
+    DOWNLOAD_TIMEOUT,
+    DOWNLOAD_CHUNK_KB,
+    DOWNLOAD_POOL_SIZE,
+    DOWNLOAD_RETRIES,
+    DOWNLOAD_TMP_DIR,
+)
+
+
+class DownloadError(Exception):
+    """Download rejected before any OCR work; status_code is the HTTP status to report."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+# Magic bytes → fileType
+SIGNATURES = [
+    (b"%PDF-", "pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image"),
+    (b"\xff\xd8\xff", "image"),
+    (b"GIF87a", "image"),
+    (b"GIF89a", "image"),
+    (b"II*\x00", "image"),
+    (b"MM\x00*", "image"),
+    (b"BM", "image"),
+]
+
+
+def sniff_file_type(head: bytes):
+    """Returns "pdf", "image" or None from the first bytes of a file."""
+    # Some generators put junk before the PDF header; poppler tolerates it
+    if b"%PDF-" in head[:1024]:
+        return "pdf"
+    for signature, file_type in SIGNATURES:
+        if head.startswith(signature):
+            return file_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image"
+    return None
+
+
+# SHARED SESSION (keep-alive + connection pool)
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=DOWNLOAD_RETRIES,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset({"GET"}),
+            )
+            adapter = HTTPAdapter(
+                pool_connections=DOWNLOAD_POOL_SIZE,
+                pool_maxsize=DOWNLOAD_POOL_SIZE,
+                max_retries=retry,
+            )
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+class DownloadedFile:
+    """
+    A download spooled to a temp file (deleted on close or when garbage
+    collected), with its sha256 computed while streaming.
+    """
+
+    def __init__(self, file, sha256: str, size: int, file_type: str):
+        self._file = file
+        self.path = file.name
+        self.sha256 = sha256
+        self.size = size
+        self.file_type = file_type
+
+    def read_bytes(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def download_to_file(url: str, expected_type: str = None, max_bytes: int = None) -> DownloadedFile:
+    """
+    Streams url into a temp file, chunk by chunk.
+
+    Rejects early (before reading the body) when Content-Length is over
+    max_bytes, and after the first chunk when its magic bytes don't match
+    expected_type, so an HTML error page or a huge upload never gets
+    buffered.
+    """
+    if max_bytes is None:
+        max_bytes = int(DOWNLOAD_MAX_MB * 1024 * 1024)
+
+    response = get_session().get(url, stream=True, timeout=DOWNLOAD_TIMEOUT)
+    with response:
+        response.raise_for_status()
+
+        declared = response.headers.get("Content-Length")
+        if declared and declared.isdigit() and int(declared) > max_bytes:
+            raise DownloadError(f"File is larger than {max_bytes} bytes", status_code=413)
+
+        f = tempfile.NamedTemporaryFile(suffix=f".{expected_type or 'bin'}", dir=DOWNLOAD_TMP_DIR)
+        try:
+            sha = hashlib.sha256()
+            size = 0
+            file_type = None
+
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_KB * 1024):
+                if not chunk:
+                    continue
+
+                if size == 0:
+                    file_type = sniff_file_type(chunk)
+                    if expected_type and file_type != expected_type:
+                        raise DownloadError(
+                            f"Downloaded file is not a {expected_type} "
+                            f"(Content-Type: {response.headers.get('Content-Type', 'unknown')})",
+                            status_code=415,
+                        )
+
+                size += len(chunk)
+                if size > max_bytes:
+                    raise DownloadError(f"File is larger than {max_bytes} bytes", status_code=413)
+
+                sha.update(chunk)
+                f.write(chunk)
+
+            if size == 0:
+                raise DownloadError("Downloaded file is empty")
+
+            f.flush()
+        except BaseException:
+            f.close()
+            raise
+
+    return DownloadedFile(f, sha.hexdigest(), size, file_type)
@@ -1,12 +1,31 @@
+import logging
 import os
 import re
 import time
 import random
+import asyncio
+import contextvars
+import threading
 from typing import Optional
 
 from dotenv import load_dotenv
-from google import genai
-from google.genai import types
+
+from app.core.config import (
+    GEMINI_MODEL,
+    GEMINI_CHUNK_CHARS,
+    GEMINI_CONCURRENCY,
+    GEMINI_MAX_RETRIES,
+    GEMINI_RPM,
+    GEMINI_TPM,
+    GEMINI_MAX_QUEUE_WAIT,
+    GEMINI_BREAKER_FAILURES,
+    GEMINI_BREAKER_COOLDOWN,
+)
+from app.services.llm_cache import llm_cache_key, cached_llm_call_async
+from app.utils.rate_limit import RateLimiter, CircuitBreaker
+from app.core.metrics import track_stage, record_error
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
@@ -16,17 +35,47 @@ load_dotenv()
 ENABLE_LLM = os.getenv("ENABLE_LLM", "true").lower() == "true"
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-# Initialize client
-# We use 'v1alpha' because preview models often live there
+# Client is created on first use: importing google.genai is slow
+# and the service must answer /health before that.
 client = None
-if ENABLE_LLM and GEMINI_API_KEY:
-    try:
-        client = genai.Client(
-            api_key=GEMINI_API_KEY,
-            http_options={"api_version": "v1alpha"}
-        )
-    except Exception as e:
-        print(f"⚠️ Error initializing Gemini Client: {e}")
+_client_initialized = False
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Returns the Gemini client, or None if the LLM is disabled/unavailable."""
+    global client, _client_initialized
+    with _client_lock:
+        if _client_initialized:
+            return client
+        _client_initialized = True
+
+        if ENABLE_LLM and GEMINI_API_KEY:
+            try:
+                from google import genai
+
+                # We use 'v1alpha' because preview models often live there
+                client = genai.Client(
+                    api_key=GEMINI_API_KEY,
+                    http_options={"api_version": "v1alpha"}
+                )
+            except Exception as e:
+                logger.warning(f"Error initializing Gemini Client: {e}")
+
+        return client
+
+# Shared by every request in this process
+limiter = RateLimiter(GEMINI_RPM, GEMINI_TPM, max_wait=GEMINI_MAX_QUEUE_WAIT)
+breaker = CircuitBreaker(GEMINI_BREAKER_FAILURES, GEMINI_BREAKER_COOLDOWN)
+
+
+def gemini_status() -> dict:
+    return {
+        "enabled": ENABLE_LLM and get_client() is not None,
+        "model": GEMINI_MODEL,
+        "limiter": limiter.state(),
+        "breaker": breaker.state(),
+    }
 
 
 # SAFETY HELPERS
@@ -64,20 +113,20 @@ def extract_text_from_response(response) -> Optional[str]:
     """
     try:
         if not response.candidates:
-            print("⚠️ Gemini Debug: No candidates returned.")
+            logger.warning("Gemini Debug: No candidates returned.")
             return None
 
         candidate = response.candidates[0]
 
         # Log unexpected finish reasons
         if candidate.finish_reason != "STOP":
-            print(f"⚠️ Gemini stopped due to reason: {candidate.finish_reason}")
+            logger.warning(f"Gemini stopped due to reason: {candidate.finish_reason}")
             # If max tokens hit, we usually still want the partial text
             if candidate.finish_reason != "MAX_TOKENS":
                 return None
 
         if not candidate.content or not candidate.content.parts:
-            print("⚠️ Gemini Debug: Candidate has zero content parts.")
+            logger.warning("Gemini Debug: Candidate has zero content parts.")
             return None
 
         text_parts = []
@@ -93,7 +142,7 @@ def extract_text_from_response(response) -> Optional[str]:
         return extracted_text
 
     except Exception as e:
-        print(f"🔥 Extraction Logic Error: {str(e)}")
+        logger.error(f"Extraction Logic Error: {str(e)}")
         return None
 
 
@@ -128,112 +177,315 @@ OCR TEXT:
 
 
 
-# MAIN REFINEMENT FUNCTION
+# CHUNKING
 
-def refine_text_with_gemini(cleaned_text: str) -> str:
-    """
-    Refines text using 'gemini-2.5-flash-preview-09-2025'.
+PAGE_MARKER = re.compile(r"-{3} page \d+ -{3}", re.IGNORECASE)
 
-    ✅ IMPORTANT:
-    - This function NEVER returns None.
-    - If Gemini fails/rejects output, it returns cleaned_text as fallback.
+
+def _split_long(segment: str, max_chars: int) -> list[str]:
+    """Splits an oversized segment on line breaks, then on spaces. Lossless."""
+    pieces = []
+    while len(segment) > max_chars:
+        cut = segment.rfind("\n", 0, max_chars)
+        if cut <= 0:
+            cut = segment.rfind(" ", 0, max_chars)
+        if cut <= 0:
+            cut = max_chars - 1
+        pieces.append(segment[:cut + 1])
+        segment = segment[cut + 1:]
+    if segment:
+        pieces.append(segment)
+    return pieces
+
+
+def split_into_chunks(text: str, max_chars: int) -> list[str]:
     """
+    Splits text into chunks of at most max_chars, preferring page
+    boundaries, then line/section boundaries. "".join(chunks) == text.
+    """
+    if len(text) <= max_chars:
+        return [text]
 
-    # If disabled → return original text
-    if not ENABLE_LLM:
-        print("ℹ️ Gemini LLM disabled via configuration")
-        return cleaned_text
+    starts = [m.start() for m in PAGE_MARKER.finditer(text) if m.start() > 0]
+    bounds = [0] + starts + [len(text)]
 
-    if not client:
-        print("⚠️ Gemini client not initialized")
-        return cleaned_text
+    segments = []
+    for a, b in zip(bounds, bounds[1:]):
+        segments.extend(_split_long(text[a:b], max_chars))
+
+    chunks = []
+    current = ""
+    for segment in segments:
+        if current and len(current) + len(segment) > max_chars:
+            chunks.append(current)
+            current = ""
+        current += segment
+    if current:
+        chunks.append(current)
+
+    return chunks
 
-    if not cleaned_text or not cleaned_text.strip():
-        return cleaned_text
 
-    # 1) INPUT TRUNCATION
-    SAFE_CHAR_LIMIT = 25000
-    if len(cleaned_text) > SAFE_CHAR_LIMIT:
-        print(f"⚠️ Input too long ({len(cleaned_text)} chars). Truncating to {SAFE_CHAR_LIMIT}...")
-        cleaned_text = cleaned_text[:SAFE_CHAR_LIMIT] + "... [TRUNCATED]"
 
-    # Safety settings
-    safety_settings = [
+# CHUNK REFINEMENT
+
+def _safety_settings():
+    from google.genai import types
+
+    return [
         types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="BLOCK_NONE"),
         types.SafetySetting(category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="BLOCK_NONE"),
         types.SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="BLOCK_NONE"),
         types.SafetySetting(category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="BLOCK_NONE"),
     ]
 
-    MAX_RETRIES = 5
 
-    for attempt in range(MAX_RETRIES):
+GENERATION_PARAMS = {"temperature": 0.2, "max_output_tokens": 8192}
+
+
+async def refine_chunk_with_gemini(chunk: str, label: str = "") -> Optional[str]:
+    """
+    Refines one chunk, served from the LLM cache when the same prompt
+    was refined before. Returns None if the chunk should fall back
+    to its cleaned text (error, empty output or failed safety checks).
+    """
+    if not chunk.strip():
+        return None
+
+    key = llm_cache_key(build_prompt(chunk), GEMINI_MODEL, GENERATION_PARAMS)
+    return await cached_llm_call_async(key, GEMINI_MODEL, lambda: _call_gemini(chunk, label))
+
+
+def estimate_tokens(prompt: str) -> int:
+    # ~4 chars per token; the refined output is about as long as the input
+    return (len(prompt) // 4) * 2
+
+
+async def _call_gemini(chunk: str, label: str) -> Optional[str]:
+    """
+    Sends one chunk to Gemini through the async client, with retries.
+    Every attempt goes through the shared rate limiter and circuit breaker.
+    """
+    from google.genai import types
+
+    client = get_client()
+    prompt = build_prompt(chunk)
+
+    for attempt in range(GEMINI_MAX_RETRIES):
+        if breaker.is_open():
+            logger.warning(f"Gemini circuit open{label}. Using fallback.")
+            return None
+
+        if not await limiter.acquire(estimate_tokens(prompt)):
+            logger.warning(f"Gemini quota queue too long{label}. Using fallback.")
+            return None
+
+        # Half-open: only one probe call goes through
+        if not breaker.allow():
+            logger.warning(f"Gemini circuit open{label}. Using fallback.")
+            return None
+
         try:
-            print(f"🔄 Sending request to Gemini (Attempt {attempt+1}/{MAX_RETRIES})...")
+            logger.info(f"Sending request to Gemini{label} (Attempt {attempt+1}/{GEMINI_MAX_RETRIES})...")
 
             start_time = time.time()
-            response = client.models.generate_content(
-                model="gemini-2.5-flash-preview-09-2025",
+            response = await client.aio.models.generate_content(
+                model=GEMINI_MODEL,
                 contents=[
                     types.Content(
                         role="user",
-                        parts=[types.Part(text=build_prompt(cleaned_text))]
+                        parts=[types.Part(text=prompt)]
                     )
                 ],
                 config=types.GenerateContentConfig(
-                    temperature=0.2,
-                    max_output_tokens=8192,
-                    safety_settings=safety_settings,
+                    **GENERATION_PARAMS,
+                    safety_settings=_safety_settings(),
                 ),
             )
             elapsed = time.time() - start_time
+            breaker.record_success()
 
             refined_text = extract_text_from_response(response)
 
             # If empty → fallback
             if not refined_text:
-                print("⚠️ Received empty response from Gemini. Using fallback.")
-                return cleaned_text
+                logger.warning(f"Received empty response from Gemini{label}. Using fallback.")
+                return None
 
             # OUTPUT SAFETY VALIDATIONS
 
             # Check 1: Length Ratio
-            if not length_safety_check(cleaned_text, refined_text, max_ratio=3.0):
-                print("⚠️ Output rejected: Excessive expansion.")
-                print(f"   Input Length: {len(cleaned_text)} -> Output Length: {len(refined_text)}")
-                return cleaned_text  # ✅ fallback instead of None
+            if not length_safety_check(chunk, refined_text, max_ratio=3.0):
+                logger.warning(
+                    f"Output rejected{label}: Excessive expansion "
+                    f"(Input Length: {len(chunk)} -> Output Length: {len(refined_text)})"
+                )
+                return None
 
             # Check 2: Keyword Coverage
-            if not keyword_coverage_check(cleaned_text, refined_text):
-                print("⚠️ Output rejected: Keyword coverage too low (potential hallucination).")
-                return cleaned_text  # ✅ fallback
+            if not keyword_coverage_check(chunk, refined_text):
+                logger.warning(f"Output rejected{label}: Keyword coverage too low (potential hallucination).")
+                return None
 
             # SUCCESS LOGGING
-            print(f"✅ Gemini Refinement Successful! (Time: {elapsed:.2f}s)")
-            print(f"   Input Length: {len(cleaned_text)} chars")
-            print(f"   Output Length: {len(refined_text)} chars")
-            print(f"   Preview: {refined_text[:100].replace(chr(10), ' ')}...")
+            logger.info(
+                f"Gemini Refinement Successful{label}! (Time: {elapsed:.2f}s, "
+                f"Input Length: {len(chunk)} chars, Output Length: {len(refined_text)} chars)"
+            )
 
             return refined_text
 
         except Exception as e:
             error_str = str(e)
+            breaker.record_failure()
 
-            # Handle Rate Limits
+            # Handle Rate Limits: every caller backs off together via the
+            # shared limiter instead of each sleeping on its own schedule
             if "429" in error_str or "RESOURCE_EXHAUSTED" in error_str or "503" in error_str:
                 sleep_time = (2 ** attempt) + 2
-                print(f"⏳ Quota exceeded. Waiting {sleep_time}s...")
-                time.sleep(sleep_time)
+                logger.warning(f"Quota exceeded{label}. Pausing Gemini calls for {sleep_time}s...")
+                limiter.pause(sleep_time)
                 continue  # ✅ retry
 
             # Handle Not Found
             elif "404" in error_str and "NOT_FOUND" in error_str:
-                print(f"❌ Model 'gemini-2.5-flash-preview-09-2025' not found.")
-                return cleaned_text
+                logger.error(f"Model '{GEMINI_MODEL}' not found.")
+                return None
 
             else:
-                print(f"🔥 Gemini fatal error: {error_str}")
-                return cleaned_text
+                logger.error(f"Gemini fatal error{label}: {error_str}")
+                return None
+
+    logger.error(f"Max retries reached{label}. Skipping LLM refinement.")
+    return None
+
+
+
+# MAIN REFINEMENT FUNCTION
+
+def split_kept(text: str, keep: list) -> list[tuple[str, bool]]:
+    """
+    Splits text into [(segment, refine)] around the sorted (start, end)
+    spans in `keep`, which are not refined. "".join(segments) == text.
+    """
+    pieces = []
+    pos = 0
+    for start, end in keep:
+        if start > pos:
+            pieces.append((text[pos:start], True))
+        if end > start:
+            pieces.append((text[start:end], False))
+        pos = max(pos, end)
+    if pos < len(text):
+        pieces.append((text[pos:], True))
+    return pieces
+
+
+async def refine_text_with_gemini_async(cleaned_text: str, keep: list = None, stats: dict = None) -> str:
+    """
+    Splits long text on page/section boundaries and refines the chunks
+    concurrently (at most GEMINI_CONCURRENCY in flight), stitching the
+    results back in order. A chunk that fails keeps its cleaned text.
+    Spans listed in `keep` ((start, end) offsets, sorted) are passed
+    through as they are, without an LLM call. If given, stats["fallbacks"]
+    is set to the number of chunks that fell back.
+
+    ✅ IMPORTANT:
+    - This function NEVER returns None.
+    - If every chunk falls back, it returns cleaned_text unchanged.
+    """
+
+    # If disabled → return original text
+    if not ENABLE_LLM:
+        logger.info("Gemini LLM disabled via configuration")
+        return cleaned_text
 
-    print("❌ Max retries reached. Skipping LLM refinement.")
-    return cleaned_text
\ No newline at end of file
+    if not get_client():
+        logger.warning("Gemini client not initialized")
+        return cleaned_text
+
+    if not cleaned_text or not cleaned_text.strip():
+        return cleaned_text
+
+    pieces = split_kept(cleaned_text, keep or [])
+    if not any(wanted and segment.strip() for segment, wanted in pieces):
+        return cleaned_text
+
+    stats = stats if stats is not None else {}
+    stats["fallbacks"] = 0
+
+    # Upstream is failing: don't queue behind it
+    if breaker.is_open():
+        logger.warning("Gemini circuit open. Skipping LLM refinement.")
+        stats["fallbacks"] = sum(1 for segment, wanted in pieces if wanted and segment.strip())
+        return cleaned_text
+
+    # [(text, refine)]: segments to refine are split into chunks
+    chunks = []
+    for segment, wanted in pieces:
+        if wanted and segment.strip():
+            chunks.extend((chunk, True) for chunk in split_into_chunks(segment, GEMINI_CHUNK_CHARS))
+        else:
+            chunks.append((segment, False))
+    to_refine = [chunk for chunk, refine in chunks if refine]
+    semaphore = asyncio.Semaphore(max(1, GEMINI_CONCURRENCY))
+
+    async def refine(i, chunk):
+        label = f" [chunk {i+1}/{len(to_refine)}]" if len(to_refine) > 1 else ""
+        async with semaphore:
+            return await refine_chunk_with_gemini(chunk, label)
+
+    refined = await asyncio.gather(*(refine(i, c) for i, c in enumerate(to_refine)))
+
+    # Chunks that fell back to their cleaned text
+    stats["fallbacks"] = sum(r is None for r in refined)
+    for _ in range(stats["fallbacks"]):
+        record_error("llm")
+
+    if all(r is None for r in refined):
+        return cleaned_text
+
+    results = iter(refined)
+    stitched = []
+    for chunk, wanted in chunks:
+        r = next(results) if wanted else None
+        stitched.append((r if r is not None else chunk).strip())
+    return "\n\n".join(stitched)
+
+
+# EVENT LOOP
+
+# Every Gemini call in this process runs on one long-lived loop: the
+# client's async connection pool is bound to the loop that first used it,
+# so a fresh asyncio.run() per document breaks every other call.
+_loop = None
+_loop_pid = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop, _loop_pid
+    with _loop_lock:
+        # Per process: a forked worker does not inherit the loop's thread
+        if _loop is None or _loop_pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            _loop_pid = os.getpid()
+            threading.Thread(target=_loop.run_forever, name="gemini-loop", daemon=True).start()
+        return _loop
+
+
+async def _in_context(coro, context: contextvars.Context):
+    return await asyncio.get_running_loop().create_task(coro, context=context)
+
+
+def refine_text_with_gemini(cleaned_text: str, keep: list = None, stats: dict = None) -> str:
+    """
+    Sync entry point for the pipeline threads.
+    Refines text using GEMINI_MODEL; see refine_text_with_gemini_async.
+    Runs on the shared Gemini loop, with the caller's context so the
+    request's timing breakdown still applies.
+    """
+    with track_stage("llm", size=len(cleaned_text or "")):
+        context = contextvars.copy_context()
+        coro = _in_context(refine_text_with_gemini_async(cleaned_text, keep, stats), context)
+        return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
@@ -0,0 +1,135 @@
+import logging
+import asyncio
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+
+from app.core.config import LLM_CACHE_ENABLED, LLM_CACHE_DIR, LLM_CACHE_MAX_MB, LLM_CACHE_TTL_HOURS
+from app.utils.disk_cache import DiskCache
+from app.core.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+
+llm_cache = DiskCache(
+    LLM_CACHE_DIR,
+    LLM_CACHE_MAX_MB * 1024 * 1024,
+    ttl=LLM_CACHE_TTL_HOURS * 3600,
+)
+
+
+def llm_cache_key(prompt: str, model: str, params: dict) -> str:
+    blob = json.dumps(
+        {"prompt": prompt, "model": model, "params": params},
+        sort_keys=True,
+    ).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one upstream call.
+    Waiters share a concurrent.futures.Future, so sync callers on
+    pipeline threads and coroutines on the long-lived Gemini loop
+    (which await it through asyncio.wrap_future) can join the same call.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.collapsed = 0
+
+    def claim(self, key: str):
+        """Returns (future, is_leader). Only the leader makes the call."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.collapsed += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            return future, True
+
+    def finish(self, key: str, future: Future, result=None, error: BaseException = None):
+        with self._lock:
+            self._calls.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+
+single_flight = SingleFlight()
+
+
+def _store(key: str, text, model: str):
+    # Only outputs that passed the safety checks reach here as non-None
+    if text is None:
+        return
+    try:
+        llm_cache.set(key, {"text": text, "model": model})
+    except OSError as e:
+        logger.warning(f"Could not write LLM cache entry: {e}")
+
+
+def cached_llm_call(key: str, model: str, call):
+    """
+    Sync version: returns the cached text for key, or runs call()
+    (once for all concurrent identical requests) and caches its result.
+    call() returns the refined text, or None when the output must not
+    be reused (error, fallback, failed safety checks).
+    """
+    if not LLM_CACHE_ENABLED:
+        return call()
+
+    hit = llm_cache.get(key)
+    record_cache("llm", hit is not None)
+    if hit is not None:
+        return hit["text"]
+
+    future, leader = single_flight.claim(key)
+    if not leader:
+        return future.result()
+
+    try:
+        text = call()
+    except BaseException as e:
+        single_flight.finish(key, future, error=e)
+        raise
+
+    _store(key, text, model)
+    single_flight.finish(key, future, result=text)
+    return text
+
+
+async def cached_llm_call_async(key: str, model: str, call):
+    """Async version of cached_llm_call; call() returns an awaitable."""
+    if not LLM_CACHE_ENABLED:
+        return await call()
+
+    hit = await asyncio.to_thread(llm_cache.get, key)
+    record_cache("llm", hit is not None)
+    if hit is not None:
+        return hit["text"]
+
+    future, leader = single_flight.claim(key)
+    if not leader:
+        return await asyncio.wrap_future(future)
+
+    try:
+        text = await call()
+    except BaseException as e:
+        single_flight.finish(key, future, error=e)
+        raise
+
+    await asyncio.to_thread(_store, key, text, model)
+    single_flight.finish(key, future, result=text)
+    return text
+
+
+def llm_cache_stats() -> dict:
+    stats = llm_cache.stats()
+    stats["enabled"] = LLM_CACHE_ENABLED
+    stats["collapsed"] = single_flight.collapsed
+    return stats
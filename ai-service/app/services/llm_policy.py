@@ -0,0 +1,105 @@
+import logging
+import re
+
+from app.core.config import (
+    LLM_POLICY,
+    LLM_REFINE_TEXT_LAYER,
+    LLM_MIN_CONFIDENCE,
+    LLM_MAX_LOW_CONF_RATIO,
+)
+from app.services.gemini_refinement import refine_text_with_gemini
+from app.core.metrics import record_llm_decision
+
+logger = logging.getLogger(__name__)
+
+# Page markers from join_pages, as they survive cleanup (lowercased)
+PAGE_MARKER_RE = re.compile(r"-{3} page (\d+) -{3}", re.IGNORECASE)
+
+
+def page_llm_decision(page: dict) -> str:
+    """
+    "refine" or "skip" for one page. Text-layer pages follow
+    LLM_REFINE_TEXT_LAYER. OCR'd pages follow LLM_POLICY: with
+    "confidence", only pages that Tesseract read poorly go to the LLM:
+    a mean word confidence under LLM_MIN_CONFIDENCE, or more than
+    LLM_MAX_LOW_CONF_RATIO of the words under LLM_LOW_CONF_WORD.
+    """
+    if page.get("method") == "text_layer":
+        # Nothing to correct, but the LLM still adds the structure concept extraction relies on
+        return "refine" if LLM_REFINE_TEXT_LAYER else "skip"
+
+    if LLM_POLICY == "always":
+        return "refine"
+
+    confidence = page.get("confidence")
+    if not confidence:
+        return "refine"  # unknown quality
+    if not confidence["words"]:
+        return "skip"  # blank page
+
+    if confidence["mean"] < LLM_MIN_CONFIDENCE or confidence["lowRatio"] > LLM_MAX_LOW_CONF_RATIO:
+        return "refine"
+    return "skip"
+
+
+def page_spans(cleaned_text: str, pages: list[dict]) -> dict:
+    """{page number: (start, end)} of each page's part of cleaned_text, found by its page marker."""
+    markers = [(m.start(), int(m.group(1))) for m in PAGE_MARKER_RE.finditer(cleaned_text)]
+    if not markers:
+        # Single image: the whole text is its only page
+        return {pages[0]["page"]: (0, len(cleaned_text))} if pages else {}
+
+    spans = {}
+    for i, (start, number) in enumerate(markers):
+        end = markers[i + 1][0] if i + 1 < len(markers) else len(cleaned_text)
+        spans[number] = (0 if i == 0 else start, end)
+    return spans
+
+
+def confidence_summary(pages: list[dict]):
+    """Mean word confidence over every OCR'd word of the document (None without OCR'd words)."""
+    words = total = 0
+    for p in pages:
+        confidence = p.get("confidence")
+        if confidence and confidence["words"]:
+            words += confidence["words"]
+            total += confidence["mean"] * confidence["words"]
+    return round(total / words, 1) if words else None
+
+
+def llm_report(pages: list[dict], fallback_chunks: int = 0) -> dict:
+    """
+    {"policy", "refinedPages", "skippedPages", "meanConfidence",
+    "fallbackChunks"} of pages carrying page["llm"]; fallbackChunks
+    counts chunks that kept their cleaned text because Gemini failed.
+    """
+    return {
+        "policy": LLM_POLICY,
+        "refinedPages": [p["page"] for p in pages if p.get("llm") == "refine"],
+        "skippedPages": [p["page"] for p in pages if p.get("llm") == "skip"],
+        "meanConfidence": confidence_summary(pages),
+        "fallbackChunks": fallback_chunks,
+    }
+
+
+def refine_document(cleaned_text: str, pages: list[dict]) -> tuple[str, dict]:
+    """
+    Runs Gemini over the pages the policy selects and keeps the cleaned
+    text of the others. Sets page["llm"] on every page and returns
+    (llm_text, llm_report(pages)).
+    """
+    for p in pages:
+        p["llm"] = page_llm_decision(p)
+        record_llm_decision(p["llm"])
+
+    report = llm_report(pages)
+    if not report["refinedPages"]:
+        logger.info(f"LLM refinement skipped: all {len(pages)} pages read confidently")
+        return cleaned_text, report
+
+    spans = page_spans(cleaned_text, pages)
+    keep = sorted(spans[n] for n in report["skippedPages"] if n in spans)
+    stats = {}
+    llm_text = refine_text_with_gemini(cleaned_text, keep=keep, stats=stats)
+    report["fallbackChunks"] = stats.get("fallbacks", 0)
+    return llm_text, report
@@ -1,17 +1,36 @@
+import logging
 import os
 import re
+import threading
 from typing import Optional
 
 from dotenv import load_dotenv
 
-# If you use OpenAI
-from openai import OpenAI
+from app.services.llm_cache import llm_cache_key, cached_llm_call
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
 
-# LLM CLIENT SETUP
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# LLM CLIENT SETUP (created on first use)
+client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global client
+    with _client_lock:
+        if client is None:
+            # If you use OpenAI
+            from openai import OpenAI
+
+            client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        return client
+
+OPENAI_MODEL = "gpt-4o-mini"  # fast + cost-efficient
+SYSTEM_PROMPT = "You are a careful academic editor."
+TEMPERATURE = 0.2  # LOW temperature = less hallucination
 
 
 
@@ -85,15 +104,20 @@ def refine_text_with_llm(
         return None
 
     prompt = build_prompt(cleaned_text)
+    key = llm_cache_key(f"{SYSTEM_PROMPT}\n\n{prompt}", OPENAI_MODEL, {"temperature": TEMPERATURE})
+
+    return cached_llm_call(key, OPENAI_MODEL, lambda: _call_openai(cleaned_text, prompt))
+
 
+def _call_openai(cleaned_text: str, prompt: str) -> Optional[str]:
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",  # fast + cost-efficient
+        response = get_client().chat.completions.create(
+            model=OPENAI_MODEL,
             messages=[
-                {"role": "system", "content": "You are a careful academic editor."},
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
-            temperature=0.2  # LOW temperature = less hallucination
+            temperature=TEMPERATURE
         )
 
         refined_text = response.choices[0].message.content.strip()
@@ -102,15 +126,15 @@ def refine_text_with_llm(
         # SAFETY VALIDATIONS
 
         if not length_safety_check(cleaned_text, refined_text):
-            print("⚠️ LLM rejected: excessive expansion")
+            logger.warning("LLM rejected: excessive expansion")
             return None
 
         if not keyword_coverage_check(cleaned_text, refined_text):
-            print("⚠️ LLM rejected: keyword coverage too low")
+            logger.warning("LLM rejected: keyword coverage too low")
             return None
 
         return refined_text
 
     except Exception as e:
-        print("🔥 LLM refinement failed:", str(e))
+        logger.error(f"LLM refinement failed: {e}")
         return None
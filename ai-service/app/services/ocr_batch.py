@@ -0,0 +1,130 @@
+import logging
+import asyncio
+
+from app.core.config import (
+    BATCH_DOWNLOAD_CONCURRENCY,
+    BATCH_OCR_CONCURRENCY,
+    BATCH_LLM_CONCURRENCY,
+    BATCH_CONCEPT_CONCURRENCY,
+    BATCH_QUEUE_SIZE,
+)
+from app.core.admission import ocr_admission
+from app.services.ocr_service import (
+    download_document,
+    validate_file_type,
+    lookup_cached,
+    extract_document,
+    build_result,
+    cache_result,
+)
+from app.services.text_refinement import refine_text
+from app.services.llm_policy import refine_document
+from app.services.concept_extraction import extract_concepts
+
+logger = logging.getLogger(__name__)
+
+
+# STAGE FUNCTIONS
+# Each takes the item dict, fills in its outputs, and sets item["result"]
+# once the document is finished (last stage, or a cache hit).
+
+def _download(item: dict):
+    payload = item["payload"]
+    validate_file_type(payload.fileType)
+
+    document = download_document(payload.fileUrl, payload.fileType)
+    item["sha256"] = document.sha256
+    cached = lookup_cached(document.sha256, payload.fileType)
+
+    if cached is not None:
+        document.close()
+        item["result"] = cached
+    else:
+        # The temp file is also removed if the item is dropped mid-batch
+        item["document"] = document
+
+
+def _ocr(item: dict):
+    # Shares the CPU slots with /ocr/ and jobs; waits rather than failing
+    with item.pop("document") as document, ocr_admission.slot():
+        item["rawText"], item["pages"] = extract_document(document, item["payload"].fileType)
+        item["cleanedText"] = refine_text(item["rawText"])
+
+
+def _llm(item: dict):
+    item["llmText"], item["llm"] = refine_document(item["cleanedText"], item["pages"])
+
+
+def _concepts(item: dict):
+    concepts = extract_concepts(item["llmText"])
+    result = build_result(item["rawText"], item["cleanedText"], item["llmText"], concepts, item["pages"], item["llm"])
+    cache_result(item["sha256"], item["payload"].fileType, result)
+    item["result"] = result
+
+
+STAGES = [
+    ("download", _download, BATCH_DOWNLOAD_CONCURRENCY),
+    ("ocr", _ocr, BATCH_OCR_CONCURRENCY),
+    ("llm", _llm, BATCH_LLM_CONCURRENCY),
+    ("concepts", _concepts, BATCH_CONCEPT_CONCURRENCY),
+]
+
+
+def _record(item: dict, status: str, **fields) -> dict:
+    return {
+        "index": item["index"],
+        "fileUrl": item["payload"].fileUrl,
+        "status": status,
+        **fields,
+    }
+
+
+async def _stage_worker(name: str, fn, inbox: asyncio.Queue, outbox: asyncio.Queue, results: asyncio.Queue):
+    while True:
+        item = await inbox.get()
+        try:
+            await asyncio.to_thread(fn, item)
+        except Exception as e:
+            logger.error(f"Batch item {item['index']} failed in {name}: {e}")
+            await results.put(_record(item, "error", stage=name, error=str(e)))
+            continue
+
+        if "result" in item:
+            await results.put(_record(item, "done", result=item["result"]))
+        else:
+            # Bounded queue: blocks here when the next stage is saturated
+            await outbox.put(item)
+
+
+async def run_ocr_batch(payloads: list):
+    """
+    Runs many documents through a staged pipeline and yields one record
+    per document as soon as it finishes (not in submission order).
+
+    Downloads, OCR, LLM refinement and concept extraction run
+    concurrently across documents, each stage with its own concurrency
+    limit, connected by bounded queues so a slow stage applies
+    backpressure instead of buffering the whole batch.
+    """
+    results = asyncio.Queue()
+    queues = [asyncio.Queue(maxsize=max(1, BATCH_QUEUE_SIZE)) for _ in STAGES]
+    tasks = []
+
+    async def feed():
+        for index, payload in enumerate(payloads):
+            await queues[0].put({"index": index, "payload": payload})
+
+    tasks.append(asyncio.create_task(feed()))
+
+    for i, (name, fn, concurrency) in enumerate(STAGES):
+        outbox = queues[i + 1] if i + 1 < len(STAGES) else results
+        for _ in range(max(1, concurrency)):
+            tasks.append(asyncio.create_task(_stage_worker(name, fn, queues[i], outbox, results)))
+
+    try:
+        for _ in range(len(payloads)):
+            yield await results.get()
+    finally:
+        # Also runs when the client disconnects mid-stream
+        for task in tasks:
+            task.cancel()
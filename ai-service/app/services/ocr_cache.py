@@ -0,0 +1,120 @@
+import logging
+import hashlib
+import json
+
+from app.core.config import (
+    PDF_DPI,
+    PDF_TEXT_LAYER,
+    TEXT_LAYER_MIN_CHARS,
+    TEXT_LAYER_MAX_IMAGE_COVERAGE,
+    TEXT_LAYER_MARGIN,
+    OCR_BACKEND,
+    OCR_LANG,
+    PREPROCESS_MODE,
+    OCR_TARGET_DPI,
+    OCR_TARGET_GLYPH_PX,
+    OCR_PAGE_ROI,
+    OCR_BLANK_INK_RATIO,
+    GEMINI_MODEL,
+    GEMINI_CHUNK_CHARS,
+    LLM_POLICY,
+    LLM_REFINE_TEXT_LAYER,
+    LLM_MIN_CONFIDENCE,
+    LLM_LOW_CONF_WORD,
+    LLM_MAX_LOW_CONF_RATIO,
+    OCR_CACHE_ENABLED,
+    OCR_CACHE_DIR,
+    OCR_CACHE_MAX_MB,
+    OCR_CACHE_SALT,
+)
+from app.utils.disk_cache import DiskCache
+from app.core.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+
+# Bump the version of a stage whenever its output changes, so results
+# produced by the old pipeline are never served again.
+PIPELINE_VERSIONS = {
+    "text_layer": 3,
+    "preprocess": 3,
+    "ocr": 2,
+    "refine": 1,
+    "gemini": 2,
+    "concepts": 2,
+    "result": 2,  # shape of the stored result (page offsets, confidence, LLM report)
+}
+
+
+def pipeline_fingerprint() -> str:
+    """Hash of stage versions plus the settings that change pipeline output."""
+    settings = {
+        "stages": PIPELINE_VERSIONS,
+        "pdf_dpi": PDF_DPI,
+        "pdf_text_layer": PDF_TEXT_LAYER,
+        "text_layer_min_chars": TEXT_LAYER_MIN_CHARS,
+        "text_layer_scans": [TEXT_LAYER_MAX_IMAGE_COVERAGE, TEXT_LAYER_MARGIN],
+        "gemini_model": GEMINI_MODEL,
+        "gemini_chunk_chars": GEMINI_CHUNK_CHARS,
+        "llm_policy": [LLM_POLICY, LLM_REFINE_TEXT_LAYER, LLM_MIN_CONFIDENCE, LLM_LOW_CONF_WORD, LLM_MAX_LOW_CONF_RATIO],
+        "ocr_backend": OCR_BACKEND,
+        "ocr_lang": OCR_LANG,
+        "preprocess_mode": PREPROCESS_MODE,
+        "ocr_target_dpi": OCR_TARGET_DPI,
+        "ocr_target_glyph_px": OCR_TARGET_GLYPH_PX,
+        "ocr_page_roi": OCR_PAGE_ROI,
+        "ocr_blank_ink_ratio": OCR_BLANK_INK_RATIO,
+        "salt": OCR_CACHE_SALT,
+    }
+    blob = json.dumps(settings, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()[:16]
+
+
+def cache_key(file_sha256: str, file_type: str) -> str:
+    blob = f"{file_sha256}:{file_type}:{pipeline_fingerprint()}".encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+ocr_cache = DiskCache(OCR_CACHE_DIR, OCR_CACHE_MAX_MB * 1024 * 1024)
+
+
+def get_cached_result(file_sha256: str, file_type: str):
+    if not OCR_CACHE_ENABLED:
+        return None
+
+    entry = ocr_cache.get(cache_key(file_sha256, file_type))
+    record_cache("ocr", entry is not None)
+    if entry is None:
+        return None
+    return entry["result"]
+
+
+def store_result(file_sha256: str, file_type: str, result: dict):
+    if not OCR_CACHE_ENABLED:
+        return
+
+    try:
+        ocr_cache.set(
+            cache_key(file_sha256, file_type),
+            {"fingerprint": pipeline_fingerprint(), "result": result},
+        )
+    except OSError as e:
+        logger.warning(f"Could not write OCR cache entry: {e}")
+
+
+def invalidate(stale_only: bool = False) -> int:
+    """
+    Drops cached results. With stale_only, keeps the entries produced by
+    the current pipeline fingerprint and removes everything older.
+    """
+    if stale_only:
+        current = pipeline_fingerprint()
+        return ocr_cache.delete_where(lambda entry: entry.get("fingerprint") != current)
+    return ocr_cache.clear()
+
+
+def cache_stats() -> dict:
+    stats = ocr_cache.stats()
+    stats["enabled"] = OCR_CACHE_ENABLED
+    stats["fingerprint"] = pipeline_fingerprint()
+    return stats
@@ -0,0 +1,277 @@
+import logging
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: single process anyway
+    fcntl = None
+
+from app.core.config import OCR_JOB_WORKERS, OCR_JOB_DIR, OCR_JOB_RETENTION_HOURS, OCR_JOB_LEASE_SECONDS
+from app.models.schemas import OCRRequest
+from app.services.ocr_service import PIPELINE_STAGES, process_document_ocr
+
+logger = logging.getLogger(__name__)
+
+
+class OCRJobQueue:
+    """
+    Background queue for OCR documents.
+
+    - submit() returns immediately with a job id.
+    - Identical submissions (same fileUrl + fileType) that are still
+      queued or running share one job.
+    - Every job is persisted as JSON under `directory`, so queued or
+      interrupted jobs are picked up again after a restart.
+    - Memory holds job status only; results are read back from the
+      persisted JSON when asked for.
+    - Each unfinished job records the process that owns it (a random id
+      per process, since pids are reused across container restarts) and a
+      lease the owner renews every few seconds. Any worker process takes
+      over the unfinished jobs whose lease has expired.
+    """
+
+    def __init__(self, directory: str, workers: int):
+        self.directory = directory
+        self.workers = max(1, workers)
+
+        self._jobs = {}
+        self._in_flight = {}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self._last_prune = 0.0
+        self.owner = uuid.uuid4().hex
+
+    # PERSISTENCE
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def _save(self, job: dict):
+        path = self._path(job["jobId"])
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(job, f)
+        os.replace(tmp, path)
+
+    def _load(self, job_id: str):
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(self._path(job_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _prune_expired(self):
+        """Forgets finished jobs older than OCR_JOB_RETENTION_HOURS."""
+        expiry = time.time() - OCR_JOB_RETENTION_HOURS * 3600
+        self._last_prune = time.time()
+
+        for job_id, job in list(self._jobs.items()):
+            if job["status"] in ("done", "failed") and job["updatedAt"] < expiry:
+                del self._jobs[job_id]
+                try:
+                    os.remove(self._path(job_id))
+                except FileNotFoundError:
+                    pass
+
+    def _lease_expired(self, job: dict) -> bool:
+        """Whether the process that queued or is running the job stopped renewing it."""
+        if job.get("owner") == self.owner:
+            return False
+        return job.get("leaseUntil", 0) < time.time()
+
+    @contextmanager
+    def _restore_lock(self):
+        """Serializes restores and lease renewals, so two workers never adopt the same job."""
+        if fcntl is None:
+            yield
+            return
+
+        fd = os.open(os.path.join(self.directory, ".restore.lock"), os.O_CREAT | os.O_RDWR)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _restore(self):
+        """Loads persisted jobs and adopts the unfinished ones whose lease expired."""
+        restored = []
+
+        with self._restore_lock():
+            for name in os.listdir(self.directory):
+                job_id = name[:-len(".json")]
+                if not name.endswith(".json") or job_id in self._jobs:
+                    continue  # not a job, or one this process already has
+                job = self._load(job_id)
+                if job is None:
+                    continue
+
+                if job["status"] in ("done", "failed"):
+                    job["result"] = None
+                    self._jobs[job["jobId"]] = job
+                    continue
+
+                if not self._lease_expired(job):
+                    continue  # still queued or running in another worker
+
+                # Queued, or running when its process stopped → run again here
+                job["status"] = "queued"
+                job["stage"] = None
+                job["stages"] = {stage: "pending" for stage in PIPELINE_STAGES}
+                job["owner"] = self.owner
+                job["leaseUntil"] = time.time() + OCR_JOB_LEASE_SECONDS
+                self._jobs[job["jobId"]] = job
+                self._in_flight[job["dedupKey"]] = job["jobId"]
+                self._save(job)
+                restored.append(job)
+
+        self._prune_expired()
+
+        for job in sorted(restored, key=lambda j: j["createdAt"]):
+            self._queue.put(job["jobId"])
+
+        if restored:
+            logger.info(f"Restored {len(restored)} unfinished OCR job(s)")
+
+    # LIFECYCLE
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+
+            os.makedirs(self.directory, exist_ok=True)
+            self._restore()
+
+        for i in range(self.workers):
+            threading.Thread(target=self._worker, name=f"ocr-job-{i}", daemon=True).start()
+        threading.Thread(target=self._heartbeat, name="ocr-job-lease", daemon=True).start()
+
+    def _heartbeat(self):
+        """Renews the leases of this process's jobs and adopts abandoned ones."""
+        while True:
+            time.sleep(OCR_JOB_LEASE_SECONDS / 3)
+            try:
+                with self._lock:
+                    self._renew_leases()
+                    self._restore()
+            except Exception as e:
+                logger.error(f"OCR job lease renewal failed: {e}")
+
+    def _renew_leases(self):
+        lease_until = time.time() + OCR_JOB_LEASE_SECONDS
+        with self._restore_lock():
+            for job in self._jobs.values():
+                if job["status"] in ("queued", "running") and job.get("owner") == self.owner:
+                    job["leaseUntil"] = lease_until
+                    self._save(job)
+
+    def _worker(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    def _update(self, job: dict, **fields):
+        with self._lock:
+            job.update(fields)
+            job["updatedAt"] = time.time()
+            self._save(job)
+
+    def _run(self, job_id: str):
+        job = self._jobs[job_id]
+        self._update(job, status="running")
+
+        def on_stage(stage):
+            stages = dict(job["stages"])
+            if job["stage"]:
+                stages[job["stage"]] = "done"
+            stages[stage] = "running"
+            self._update(job, stage=stage, stages=stages)
+
+        try:
+            result = process_document_ocr(OCRRequest(**job["payload"]), on_stage=on_stage)
+        except Exception as e:
+            logger.error(f"OCR job {job_id} failed: {e}")
+            self._update(job, status="failed", error=str(e))
+        else:
+            stages = {stage: "done" for stage in PIPELINE_STAGES}
+            self._update(job, status="done", stage=None, stages=stages, result=result)
+            # Persisted above; get_result reads it back from there
+            job["result"] = None
+        finally:
+            with self._lock:
+                self._in_flight.pop(job["dedupKey"], None)
+
+    # PUBLIC API
+
+    def submit(self, payload: OCRRequest) -> dict:
+        self.start()
+
+        dedup_key = hashlib.sha256(f"{payload.fileType}:{payload.fileUrl}".encode("utf-8")).hexdigest()
+
+        with self._lock:
+            if time.time() - self._last_prune > 600:
+                self._prune_expired()
+
+            existing = self._in_flight.get(dedup_key)
+            if existing:
+                return self._jobs[existing]
+
+            now = time.time()
+            job = {
+                "jobId": uuid.uuid4().hex,
+                "dedupKey": dedup_key,
+                "payload": payload.model_dump(),
+                "status": "queued",
+                "stage": None,
+                "stages": {stage: "pending" for stage in PIPELINE_STAGES},
+                "error": None,
+                "result": None,
+                "createdAt": now,
+                "updatedAt": now,
+                "owner": self.owner,
+                "leaseUntil": now + OCR_JOB_LEASE_SECONDS,
+            }
+            self._jobs[job["jobId"]] = job
+            self._in_flight[dedup_key] = job["jobId"]
+            self._save(job)
+
+        self._queue.put(job["jobId"])
+        return job
+
+    def get(self, job_id: str):
+        """The job's status (without its result), or None."""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+
+        # Submitted to another worker process: read its persisted state
+        job = self._load(job_id)
+        if job is not None:
+            job["result"] = None
+        return job
+
+    def get_result(self, job_id: str):
+        """The result of a finished job, from its persisted JSON (None if gone)."""
+        job = self._load(job_id)
+        return job.get("result") if job is not None else None
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+
+job_queue = OCRJobQueue(OCR_JOB_DIR, OCR_JOB_WORKERS)
@@ -1,91 +1,466 @@
-import requests
+import logging
+import os
+import time
+import threading
+from functools import partial
 import pytesseract
 from PIL import Image
-from io import BytesIO
-from pdf2image import convert_from_bytes
 
 from app.utils.image_preprocessing import preprocess_image_for_ocr
 from app.services.text_refinement import refine_text
-from app.services.gemini_refinement import refine_text_with_gemini
+from app.services import gemini_refinement
+from app.services.llm_policy import refine_document
 from app.services.concept_extraction import extract_concepts
+from app.services.page_engine import map_pages
+from app.services.pdf_rasterizer import get_pdf_page_count, iter_pdf_pages, pdf_temp_file
+from app.services.pdf_text_layer import extract_text_layer
+from app.services.ocr_cache import get_cached_result, store_result
+from app.services.page_cache import page_cache, page_key
+from app.services.downloader import download_to_file
 from app.models.schemas import OCRRequest
+from app.core.metrics import track_stage, record_error, record_page_timings, record_cache
+from app.core.admission import ocr_admission, limit_native_threads
+from app.core.config import (
+    OCR_PAGE_TIMEOUT,
+    PDF_TEXT_LAYER,
+    PDF_DPI,
+    OCR_BACKEND,
+    OCR_LANG,
+    PAGE_CACHE_ENABLED,
+    LLM_LOW_CONF_WORD,
+)
 import shutil
 import pytesseract
 
+# Before Tesseract is loaded here or in a page worker
+limit_native_threads()
+
+try:
+    # Imported with the module (on the main thread): tesserocr sets up
+    # signal handlers on import, which fails from any other thread
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+logger = logging.getLogger(__name__)
+
 
 
 # ✅ Tesseract path setup
 pytesseract.pytesseract.tesseract_cmd = shutil.which("tesseract")
 
 
+# OCR BACKENDS
+# Both take the binarized page as a uint8 ndarray and run Tesseract
+# with the same settings (LSTM engine, single uniform block of text).
+# recognize() also returns the confidence (0-100) of every word.
+
+class PytesseractBackend:
+    """Spawns a tesseract process per page (temp image on disk, model reloaded each time)."""
+
+    name = "pytesseract"
+
+    def image_to_string(self, image) -> str:
+        return pytesseract.image_to_string(
+            image,
+            lang=OCR_LANG,
+            config="--oem 3 --psm 6",
+            timeout=OCR_PAGE_TIMEOUT
+        )
+
+    def recognize(self, image) -> tuple[str, list[float]]:
+        # One tesseract run: the text is rebuilt from the word boxes
+        data = pytesseract.image_to_data(
+            image,
+            lang=OCR_LANG,
+            config="--oem 3 --psm 6",
+            timeout=OCR_PAGE_TIMEOUT,
+            output_type=pytesseract.Output.DICT,
+        )
+
+        lines = []
+        confidences = []
+        last_line = last_paragraph = None
+        for i, word in enumerate(data["text"]):
+            conf = float(data["conf"][i])
+            if conf < 0 or not word.strip():
+                continue
+
+            paragraph = (data["block_num"][i], data["par_num"][i])
+            line = (*paragraph, data["line_num"][i])
+            if line != last_line:
+                if last_paragraph is not None and paragraph != last_paragraph:
+                    lines.append([])  # blank line between paragraphs
+                lines.append([])
+                last_line, last_paragraph = line, paragraph
+
+            lines[-1].append(word)
+            confidences.append(conf)
+
+        return "\n".join(" ".join(words) for words in lines) + "\n", confidences
+
+
+class TesserocrBackend:
+    """
+    libtesseract in-process via tesserocr: traineddata is loaded once per
+    worker (per thread, since a TessBaseAPI is not thread-safe) and pages
+    are handed over as raw buffers.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self):
+        if tesserocr is None:
+            raise RuntimeError("tesserocr is not installed")
+        self._local = threading.local()
+
+    def _api(self):
+        # Keyed by pid too: a forked page worker must not reuse its parent's engine
+        api = getattr(self._local, "api", None)
+        if api is None or self._local.pid != os.getpid():
+            api = tesserocr.PyTessBaseAPI(
+                lang=OCR_LANG,
+                psm=tesserocr.PSM.SINGLE_BLOCK,
+                oem=tesserocr.OEM.DEFAULT,
+            )
+            self._local.api = api
+            self._local.pid = os.getpid()
+        return api
+
+    def image_to_string(self, image) -> str:
+        return self.recognize(image)[0]
+
+    def recognize(self, image) -> tuple[str, list[float]]:
+        api = self._api()
+        height, width = image.shape[:2]
+        api.SetImageBytes(image.tobytes(), width, height, 1, width)
+        try:
+            if not api.Recognize(timeout=int(OCR_PAGE_TIMEOUT * 1000)):
+                raise RuntimeError(f"Tesseract timed out after {OCR_PAGE_TIMEOUT:.0f}s")
+            return api.GetUTF8Text(), [float(c) for c in api.AllWordConfidences()]
+        finally:
+            api.Clear()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_ocr_backend(name: str):
+    """Builds the named backend; tesserocr falls back to pytesseract when unavailable."""
+    if name in ("auto", "tesserocr"):
+        try:
+            backend = TesserocrBackend()
+            backend._api()  # fail here (missing traineddata) rather than on the first page
+            return backend
+        except Exception as e:
+            if name == "tesserocr":
+                logger.warning(f"tesserocr unavailable, falling back to pytesseract: {e}")
+    return PytesseractBackend()
+
+
+def get_ocr_backend():
+    """OCR_BACKEND, created on first use in each process."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_ocr_backend(OCR_BACKEND)
+        return _backend
+
+
 # IMAGE OCR
-def extract_text_from_image(image_bytes: bytes) -> str:
-    processed_img = preprocess_image_for_ocr(image_bytes)
+def confidence_stats(confidences: list[float]) -> dict:
+    """Word count, mean word confidence and share of words below LLM_LOW_CONF_WORD."""
+    if not confidences:
+        return {"words": 0, "mean": None, "lowRatio": None}
+    low = sum(c < LLM_LOW_CONF_WORD for c in confidences)
+    return {
+        "words": len(confidences),
+        "mean": round(sum(confidences) / len(confidences), 1),
+        "lowRatio": round(low / len(confidences), 3),
+    }
 
-    text = pytesseract.image_to_string(
-        processed_img,
-        config="--oem 3 --psm 6"
-    )
 
-    return text
+def ocr_page(image, dpi: int = None) -> dict:
+    """
+    Preprocess + OCR one page (runs inside the page workers).
+    image: encoded bytes or a rendered page ndarray.
+    Returns {"text", "confidence", "timings"} with milliseconds per step,
+    plus "blank" (page skipped, no OCR) or "crop" (region that was OCR'd),
+    and "pageCache" ("hit": text reused from the same page seen before).
+    """
+    timings = {}
+    page_info = {}
+    processed = preprocess_image_for_ocr(image, dpi=dpi, timings=timings, as_array=True, page_info=page_info)
 
+    if page_info.get("blank"):
+        return {"text": "", "confidence": confidence_stats([]), "timings": timings, **page_info}
 
+    if PAGE_CACHE_ENABLED:
+        start = time.perf_counter()
+        key = page_key(processed)
+        cached = page_cache.lookup(key)
+        timings["page_cache"] = round((time.perf_counter() - start) * 1000, 2)
 
-# PDF OCR (SCANNED PDF SUPPORT)
-def extract_text_from_pdf(pdf_bytes: bytes) -> str:
-    pages = convert_from_bytes(pdf_bytes, dpi=300)
+        if cached is not None:
+            text, confidence = cached
+            return {"text": text, "confidence": confidence, "timings": timings, "pageCache": "hit", **page_info}
+        page_info["pageCache"] = "miss"
 
-    full_text = []
+    start = time.perf_counter()
+    text, confidences = get_ocr_backend().recognize(processed)
+    confidence = confidence_stats(confidences)
+    timings["ocr"] = round((time.perf_counter() - start) * 1000, 2)
 
-    for i, page in enumerate(pages):
-        # Convert PIL -> bytes
-        buf = BytesIO()
-        page.save(buf, format="PNG")
-        img_bytes = buf.getvalue()
+    if PAGE_CACHE_ENABLED:
+        page_cache.store(key, text, confidence)
 
-        # Preprocess + OCR
-        page_text = extract_text_from_image(img_bytes)
+    return {"text": text, "confidence": confidence, "timings": timings, **page_info}
 
-        full_text.append(f"\n\n--- Page {i+1} ---\n{page_text}")
 
-    return "\n".join(full_text)
+def record_page(result: dict):
+    """Metrics for one page from what its worker sent back."""
+    record_page_timings(result["timings"])
+    if "pageCache" in result:
+        record_cache("page", result["pageCache"] == "hit")
 
 
+def extract_text_from_image(image) -> str:
+    return ocr_page(image)["text"]
 
-# MAIN OCR PIPELINE
-def process_document_ocr(payload: OCRRequest):
 
-    response = requests.get(payload.fileUrl, timeout=60)
-    response.raise_for_status()
 
-    raw_text = ""
+# PDF TEXT (TEXT LAYER + SCANNED PDF SUPPORT)
+def extract_pages_from_pdf(pdf_bytes: bytes) -> list[dict]:
+    with pdf_temp_file(pdf_bytes) as pdf_path:
+        return extract_pages_from_pdf_path(pdf_path)
 
-    # ✅ PDF OCR
-    if payload.fileType == "pdf":
-        raw_text = extract_text_from_pdf(response.content)
 
-    # ✅ IMAGE OCR
-    elif payload.fileType == "image":
-        raw_text = extract_text_from_image(response.content)
+def extract_pages_from_pdf_path(pdf_path: str) -> list[dict]:
+    """
+    Returns [{"page", "text", "method"}] in page order.
+    Pages with a usable embedded text layer are read directly,
+    only scanned/image-only pages are rasterized and OCR'd.
+    """
+    return list(iter_pages_from_pdf_path(pdf_path))
 
-    else:
+
+def iter_pages_from_pdf_path(pdf_path: str):
+    """Like extract_pages_from_pdf_path, but yields each page as soon as it is ready."""
+    layer = None
+
+    if PDF_TEXT_LAYER:
+        try:
+            with track_stage("text_layer") as counts:
+                layer = extract_text_layer(pdf_path)
+                counts["pages"] = len(layer)
+        except Exception as e:
+            logger.warning(f"Could not read PDF text layer, using OCR for all pages: {e}")
+
+    if layer is None:
+        layer = [None] * get_pdf_page_count(pdf_path)
+
+    ocr_numbers = [i + 1 for i, text in enumerate(layer) if text is None]
+
+    # Pages are rendered a window at a time and handed to the workers
+    # as raw arrays, so memory stays flat regardless of page count
+    page_images = (img for _, img in iter_pdf_pages(pdf_path, page_numbers=ocr_numbers))
+
+    # Preprocess + OCR, fanned out over the worker pool (results in page order)
+    results = map_pages(partial(ocr_page, dpi=PDF_DPI), page_images) if ocr_numbers else iter(())
+
+    for i, text in enumerate(layer):
+        if text is not None:
+            yield {"page": i + 1, "text": text, "method": "text_layer"}
+            continue
+
+        result, error = next(results)
+        page = {"page": i + 1, "text": "", "method": "ocr"}
+        if error is not None:
+            page["error"] = error
+            record_error("ocr")
+        else:
+            page.update(result)
+            record_page(result)
+        yield page
+
+
+def join_pages(pages: list[dict]) -> str:
+    return "\n".join(f"\n\n--- Page {p['page']} ---\n{p['text']}" for p in pages)
+
+
+def extract_text_from_pdf(pdf_bytes: bytes) -> str:
+    return join_pages(extract_pages_from_pdf(pdf_bytes))
+
+
+
+# PIPELINE STAGES
+# Each stage is a plain function so the single-document pipeline,
+# background jobs and the batch pipeline all share them.
+
+def download_document(file_url: str, file_type: str = None):
+    """
+    Streams the file into a temp file over the shared pooled session.
+    Returns a DownloadedFile (path + sha256); close it when done.
+    """
+    with track_stage("download") as counts:
+        document = download_to_file(file_url, expected_type=file_type)
+        counts["size"] = document.size
+    return document
+
+
+def validate_file_type(file_type: str):
+    if file_type not in ("pdf", "image"):
         raise ValueError("Unsupported fileType. Use pdf or image.")
 
-    # 1) Clean / refine
-    cleaned_text = refine_text(raw_text)
 
-    # 2) Gemini Refinement (optional)
-    llmText = refine_text_with_gemini(cleaned_text)
+def extract_document(document, file_type: str):
+    """Returns (raw_text, pages) for a downloaded PDF or image."""
+    pages = list(iter_document_pages(document, file_type))
 
-    # if not llmText:
-    #     llmText = cleaned_text
+    # ✅ PDF pages are joined with page markers, an image is its own text
+    if file_type == "pdf":
+        return join_pages(pages), pages
+    return pages[0]["text"], pages
 
-    # 3) Concept extraction
-    concepts = extract_concepts(llmText)
 
+def iter_document_pages(document, file_type: str):
+    """Yields the document's pages ({"page", "text", "method", ...}) as they are extracted."""
+
+    # ✅ PDF (text layer where available, OCR otherwise)
+    if file_type == "pdf":
+        yield from iter_pages_from_pdf_path(document.path)
+        return
+
+    # ✅ IMAGE OCR
+    try:
+        result = ocr_page(document.read_bytes())
+    except Exception:
+        record_error("ocr")
+        raise
+    record_page(result)
+    yield {"page": 1, "method": "ocr", **result}
+
+
+def page_offsets(raw_text: str, pages: list[dict]) -> list[tuple[int, int]]:
+    """(offset, length) of each page's text within raw_text (as built by join_pages)."""
+    offsets = []
+    pos = 0
+    for p in pages:
+        marker = f"--- Page {p['page']} ---\n"
+        at = raw_text.find(marker, pos)
+        start = at + len(marker) if at != -1 else pos  # an image has no page markers
+        offsets.append((start, len(p["text"])))
+        pos = start + len(p["text"])
+    return offsets
+
+
+def build_result(raw_text: str, cleaned_text: str, llm_text: str, concepts: list, pages: list, llm: dict = None) -> dict:
     return {
         "rawText": raw_text,
         "cleanedText": cleaned_text,
-        "llmText": llmText,
-        "concepts": concepts
+        "llmText": llm_text,
+        "concepts": concepts,
+        "pages": [
+            {**{k: v for k, v in p.items() if k != "text"}, "offset": offset, "length": length}
+            for p, (offset, length) in zip(pages, page_offsets(raw_text, pages))
+        ],
+        "llm": llm,
     }
+
+
+RESULT_FIELDS = ["rawText", "cleanedText", "llmText", "concepts", "pages", "llm"]
+
+
+def project_result(result: dict, fields: list = None, page_text: bool = False) -> dict:
+    """
+    Keeps only `fields` of a result (all of them when None). page_text
+    adds each page's own text, sliced from rawText by its offsets.
+    """
+    if page_text:
+        raw_text = result["rawText"]
+        result = {**result, "pages": [
+            {**p, "text": raw_text[p["offset"]:p["offset"] + p["length"]]} if "offset" in p else p
+            for p in result["pages"]
+        ]}
+
+    if fields is not None:
+        result = {k: v for k, v in result.items() if k in fields}
+    return result
+
+
+def cache_result(file_sha256: str, file_type: str, result: dict):
+    # Don't pin a Gemini fallback (quota/outage) in the cache, not even
+    # one chunk of it; text the policy kept from the LLM legitimately
+    # equals the cleaned text
+    report = result.get("llm")
+    if report is not None:
+        llm_fell_back = bool(report.get("fallbackChunks"))
+    else:
+        llm_fell_back = (
+            gemini_refinement.get_client() is not None
+            and result["llmText"] == result["cleanedText"]
+        )
+    if llm_fell_back:
+        logger.info(f"Not caching {file_sha256[:12]}: Gemini fell back to cleaned text")
+        return
+    store_result(file_sha256, file_type, result)
+
+
+def lookup_cached(file_sha256: str, file_type: str):
+    """Returns the cached result or None."""
+    # ✅ Same bytes + same pipeline → same result
+    cached = get_cached_result(file_sha256, file_type)
+    if cached is not None:
+        logger.info(f"OCR cache hit ({file_sha256[:12]})")
+    return cached
+
+
+
+# MAIN OCR PIPELINE
+PIPELINE_STAGES = ["download", "extract", "refine", "llm", "concepts"]
+
+
+def process_document_ocr(payload: OCRRequest, on_stage=None, shed_load: bool = False):
+    """
+    Runs the full pipeline for one document.
+    on_stage(name) is called as each of PIPELINE_STAGES starts.
+
+    Extraction and cleanup run under an OCR admission slot. With
+    shed_load, raises Overloaded instead of queueing past the bound.
+    """
+    on_stage = on_stage or (lambda stage: None)
+
+    validate_file_type(payload.fileType)
+    if shed_load:
+        # Turn the document away before downloading it
+        ocr_admission.check()
+
+    on_stage("download")
+    with download_document(payload.fileUrl, payload.fileType) as document:
+        file_sha256 = document.sha256
+
+        cached = lookup_cached(file_sha256, payload.fileType)
+        if cached is not None:
+            return cached
+
+        with ocr_admission.slot(shed_load=shed_load):
+            on_stage("extract")
+            raw_text, pages = extract_document(document, payload.fileType)
+
+            # 1) Clean / refine
+            on_stage("refine")
+            cleaned_text = refine_text(raw_text)
+
+    # 2) Gemini Refinement (optional; only the pages LLM_POLICY selects)
+    on_stage("llm")
+    llmText, llm_report = refine_document(cleaned_text, pages)
+
+    # 3) Concept extraction
+    on_stage("concepts")
+    concepts = extract_concepts(llmText)
+
+    result = build_result(raw_text, cleaned_text, llmText, concepts, pages, llm_report)
+    cache_result(file_sha256, payload.fileType, result)
+
+    return result
@@ -0,0 +1,189 @@
+import logging
+import asyncio
+import queue
+import threading
+from contextlib import closing
+
+from app.core.config import STREAM_LLM_CONCURRENCY, STREAM_QUEUE_SIZE
+from app.core.admission import ocr_admission
+from app.services.ocr_service import iter_document_pages, join_pages, build_result, cache_result
+from app.services.text_refinement import refine_text
+from app.services.gemini_refinement import refine_text_with_gemini
+from app.services.llm_policy import page_llm_decision, llm_report
+from app.core.metrics import record_llm_decision
+from app.services.concept_extraction import extract_concepts
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+def _page_record(page: dict, cleaned_text: str, llm_text: str) -> dict:
+    info = {k: v for k, v in page.items() if k != "text"}
+    return {
+        "type": "page",
+        **info,
+        "rawText": page["text"],
+        "cleanedText": cleaned_text,
+        "llmText": llm_text,
+    }
+
+
+def _extract(document, file_type: str, pages: queue.Queue, stop: threading.Event):
+    """
+    Runs on a thread: pushes each extracted page as soon as it is ready,
+    blocking while the refine stage is STREAM_QUEUE_SIZE pages behind.
+    Holds an OCR admission slot only while a page is being extracted,
+    never while waiting on the later stages (or a slow client). The
+    request was admitted before the response started, so it waits for
+    slots rather than being turned away mid-stream. Owns the document
+    from here on and closes it when done.
+    """
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        with document, closing(iter_document_pages(document, file_type)) as extracted:
+            while True:
+                with ocr_admission.slot():
+                    page = next(extracted, _DONE)
+                if page is _DONE or not put(page):
+                    return
+    except Exception as e:
+        logger.error(f"Streamed extraction failed: {e}")
+        put({"type": "error", "stage": "extract", "error": str(e)})
+    finally:
+        put(_DONE)
+
+
+def _get(pages: queue.Queue, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            return pages.get(timeout=0.5)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+async def _refine_worker(pages: queue.Queue, stop: threading.Event, refined: asyncio.Queue, records: asyncio.Queue):
+    # One worker, so pages reach the LLM stage in page order
+    while True:
+        page = await asyncio.to_thread(_get, pages, stop)
+        if page is _DONE:
+            break
+
+        if page.get("type") == "error":
+            await records.put(page)
+            continue
+
+        try:
+            cleaned = await asyncio.to_thread(refine_text, page["text"]) if page["text"].strip() else ""
+        except Exception as e:
+            logger.error(f"Streamed page {page['page']} failed in refine: {e}")
+            await records.put({"type": "error", "stage": "refine", "page": page["page"], "error": str(e)})
+            continue
+
+        await refined.put((page, cleaned))
+
+    for _ in range(max(1, STREAM_LLM_CONCURRENCY)):
+        await refined.put(_DONE)
+
+
+async def _llm_worker(refined: asyncio.Queue, records: asyncio.Queue, fallbacks: dict):
+    while True:
+        item = await refined.get()
+        if item is _DONE:
+            break
+
+        page, cleaned = item
+        page["llm"] = page_llm_decision(page)
+        record_llm_decision(page["llm"])
+
+        # refine_text_with_gemini never raises: failures fall back to the cleaned text
+        if cleaned and page["llm"] == "refine":
+            stats = {}
+            llm_text = await asyncio.to_thread(refine_text_with_gemini, cleaned, None, stats)
+            fallbacks["chunks"] += stats.get("fallbacks", 0)
+        else:
+            llm_text = cleaned
+        await records.put(_page_record(page, cleaned, llm_text))
+
+    await records.put(_DONE)
+
+
+def _stream_result(page_records: dict, concepts: list, fallback_chunks: int) -> dict:
+    """The document result (as process_document_ocr returns it) assembled from the page records."""
+    pages = []
+    for number in sorted(page_records):
+        record = page_records[number]
+        info = {k: v for k, v in record.items() if k not in ("type", "rawText", "cleanedText", "llmText")}
+        pages.append({**info, "text": record["rawText"]})
+
+    cleaned_text = "\n\n".join(page_records[n]["cleanedText"] for n in sorted(page_records))
+    llm_text = "\n\n".join(page_records[n]["llmText"] for n in sorted(page_records))
+    return build_result(join_pages(pages), cleaned_text, llm_text, concepts, pages, llm_report(pages, fallback_chunks))
+
+
+async def stream_document_ocr(document, file_type: str):
+    """
+    Runs one downloaded document through the pipeline a page at a time
+    and yields a record per page as soon as it is refined, while later
+    pages are still being OCR'd:
+
+        {"type": "page", "page", "method", "confidence", "llm", ..., "rawText", "cleanedText", "llmText"}
+        {"type": "error", "stage", "page"?, "error"}
+        {"type": "done", "pages", "errors", "concepts"}
+
+    Pages are refined one by one (not as a whole document), so page
+    records can arrive out of order once Gemini runs several at a time.
+    Concepts are extracted once, from every page's llmText in page
+    order, for the final record. A stream that finishes without errors
+    stores the assembled result in the OCR cache. Closes the document.
+    """
+    pages = queue.Queue(maxsize=max(1, STREAM_QUEUE_SIZE))
+    refined = asyncio.Queue(maxsize=max(1, STREAM_QUEUE_SIZE))
+    records = asyncio.Queue()
+    stop = threading.Event()
+    file_sha256 = document.sha256
+    fallbacks = {"chunks": 0}  # Gemini chunks that kept their cleaned text
+
+    llm_workers = max(1, STREAM_LLM_CONCURRENCY)
+    tasks = [
+        asyncio.create_task(asyncio.to_thread(_extract, document, file_type, pages, stop)),
+        asyncio.create_task(_refine_worker(pages, stop, refined, records)),
+    ]
+    tasks += [asyncio.create_task(_llm_worker(refined, records, fallbacks)) for _ in range(llm_workers)]
+
+    page_records = {}
+    errors = 0
+    finished = 0
+
+    try:
+        while finished < llm_workers:
+            record = await records.get()
+            if record is _DONE:
+                finished += 1
+                continue
+
+            if record["type"] == "page":
+                page_records[record["page"]] = record
+            else:
+                errors += 1
+            yield record
+
+        text = "\n\n".join(page_records[n]["llmText"] for n in sorted(page_records))
+        concepts = await asyncio.to_thread(extract_concepts, text) if text.strip() else []
+        if not errors and page_records:
+            await asyncio.to_thread(cache_result, file_sha256, file_type, _stream_result(page_records, concepts, fallbacks["chunks"]))
+        yield {"type": "done", "pages": len(page_records), "errors": errors, "concepts": concepts}
+    finally:
+        # Also runs when the client disconnects mid-stream
+        stop.set()
+        for task in tasks[1:]:
+            task.cancel()
@@ -0,0 +1,308 @@
+import logging
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import cv2
+import numpy as np
+
+from app.core.config import (
+    OCR_BACKEND,
+    OCR_LANG,
+    PREPROCESS_MODE,
+    OCR_TARGET_DPI,
+    OCR_TARGET_GLYPH_PX,
+    OCR_PAGE_ROI,
+    PAGE_CACHE_PATH,
+    PAGE_CACHE_MAX_DISTANCE,
+    PAGE_CACHE_MAX_ENTRIES,
+)
+from app.services.ocr_cache import PIPELINE_VERSIONS
+
+logger = logging.getLogger(__name__)
+
+
+# dHash over a 16x16 grid: 256 bits, 32 bytes per page
+HASH_SIZE = 16
+
+# Set bits per byte value, for Hamming distances over uint8 arrays
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+# Near-identical pages have near-identical proportions too
+MAX_ASPECT_DIFF = 0.1
+
+# Pages with less ink than this (headers, cover pages) are only reused
+# on an exact match: a changed digit is too large a share of their text
+NEAR_MATCH_MIN_INK = 20000
+
+# Evict once every this many inserts
+EVICT_EVERY = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fingerprint TEXT NOT NULL,
+    hash BLOB NOT NULL,
+    aspect REAL NOT NULL,
+    text TEXT NOT NULL,
+    confidence TEXT,
+    digest TEXT,
+    height INTEGER,
+    width INTEGER,
+    bits BLOB,
+    created_at REAL NOT NULL,
+    used_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS pages_fingerprint ON pages (fingerprint, id);
+CREATE INDEX IF NOT EXISTS pages_used ON pages (used_at);
+"""
+
+# Columns added after the first release of the table
+MIGRATIONS = {
+    "confidence": "TEXT",
+    "digest": "TEXT",
+    "height": "INTEGER",
+    "width": "INTEGER",
+    "bits": "BLOB",
+}
+
+
+def page_hash(image: np.ndarray) -> bytes:
+    """
+    Perceptual (difference) hash of a preprocessed page: the page is
+    shrunk to 17x16 and each bit says whether a cell is brighter than its
+    left neighbour. Rescans and re-renders of a page land a few bits apart.
+    """
+    small = cv2.resize(image, (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA)
+    return np.packbits(small[:, 1:] > small[:, :-1]).tobytes()
+
+
+def page_key(image: np.ndarray) -> dict:
+    """
+    What the cache needs of a preprocessed (binarized) page: its
+    perceptual hash and aspect ratio to find candidates, and its exact
+    pixels (packed to one bit each) plus their digest to confirm them.
+    """
+    ink = image <= 127
+    bits = np.packbits(ink).tobytes()
+    height, width = image.shape[:2]
+    return {
+        "hash": page_hash(image),
+        "aspect": height / width,
+        "shape": (height, width),
+        "ink": int(np.count_nonzero(ink)),
+        "bits": bits,
+        "digest": hashlib.sha256(f"{height}x{width}:".encode("ascii") + bits).hexdigest(),
+    }
+
+
+def same_page(key: dict, height: int, width: int, bits: bytes) -> bool:
+    """
+    Pixel check of a candidate against the page: the pages may only
+    differ in isolated specks (re-encoding noise around the binarization
+    threshold). Any difference at least 3x3 pixels wide is a glyph stroke
+    that was added, removed or changed, and the pages are different.
+    """
+    if key["shape"] != (height, width):
+        return False
+
+    a = np.frombuffer(key["bits"], dtype=np.uint8)
+    b = np.frombuffer(zlib.decompress(bits), dtype=np.uint8)
+    if a.shape != b.shape:
+        return False
+
+    diff = np.unpackbits(np.bitwise_xor(a, b), count=height * width).reshape(height, width)
+    if not diff.any():
+        return True
+    if np.count_nonzero(diff) > 0.01 * diff.size:
+        return False
+    return not cv2.morphologyEx(diff, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8)).any()
+
+
+def page_fingerprint() -> str:
+    """Hash of the settings that change the text OCR'd from a preprocessed page."""
+    settings = {
+        "preprocess": PIPELINE_VERSIONS["preprocess"],
+        "ocr": PIPELINE_VERSIONS["ocr"],
+        "ocr_backend": OCR_BACKEND,
+        "ocr_lang": OCR_LANG,
+        "preprocess_mode": PREPROCESS_MODE,
+        "ocr_target_dpi": OCR_TARGET_DPI,
+        "ocr_target_glyph_px": OCR_TARGET_GLYPH_PX,
+        "ocr_page_roi": OCR_PAGE_ROI,
+        "hash_size": HASH_SIZE,
+        "confirm": 1,
+    }
+    blob = json.dumps(settings, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()[:16]
+
+
+class PageCache:
+    """
+    Page text keyed by content, in a local SQLite file shared by the web
+    workers and the page worker processes.
+
+    A page with the exact same pixels is a hit. Otherwise the perceptual
+    hash only proposes candidates: each process keeps the hashes in
+    memory (32 bytes per page) and catches up on rows other processes
+    added before every lookup, so that is one vectorized Hamming scan.
+    A candidate is reused only if it passes same_page against the stored
+    pixels, and never for low-ink pages. Least recently used pages beyond
+    max_entries are evicted. Any database error counts as a miss: the
+    cache never fails a page.
+    """
+
+    def __init__(self, path: str, max_distance: int, max_entries: int):
+        self.path = path
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.fingerprint = page_fingerprint()
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._hashes = np.zeros((0, HASH_SIZE * HASH_SIZE // 8), dtype=np.uint8)
+        self._aspects = np.zeros(0, dtype=np.float32)
+        self._last_id = 0
+
+    def _db(self) -> sqlite3.Connection:
+        # Per thread, and per process: a forked worker must not reuse its parent's connection
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+            columns = {row[1] for row in db.execute("PRAGMA table_info(pages)")}
+            for column, kind in MIGRATIONS.items():
+                if column not in columns:
+                    db.execute(f"ALTER TABLE pages ADD COLUMN {column} {kind}")
+            db.execute("CREATE INDEX IF NOT EXISTS pages_digest ON pages (fingerprint, digest)")
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def _reset_index(self):
+        self._pid = os.getpid()
+        self._ids = self._ids[:0]
+        self._hashes = self._hashes[:0]
+        self._aspects = self._aspects[:0]
+        self._last_id = 0
+
+    def _refresh(self):
+        """Appends rows added since the last refresh (by any process) to the in-memory index."""
+        if self._pid != os.getpid() or len(self._ids) > self.max_entries * 1.2:
+            # New process, or too many evicted rows still indexed here
+            self._reset_index()
+
+        rows = self._db().execute(
+            "SELECT id, hash, aspect FROM pages WHERE fingerprint = ? AND id > ? ORDER BY id",
+            (self.fingerprint, self._last_id),
+        ).fetchall()
+        if not rows:
+            return
+
+        self._ids = np.concatenate([self._ids, np.array([r[0] for r in rows], dtype=np.int64)])
+        self._hashes = np.concatenate([self._hashes, np.frombuffer(b"".join(r[1] for r in rows), dtype=np.uint8).reshape(len(rows), -1)])
+        self._aspects = np.concatenate([self._aspects, np.array([r[2] for r in rows], dtype=np.float32)])
+        self._last_id = rows[-1][0]
+
+    def _hit(self, db: sqlite3.Connection, page_id: int, text: str, confidence: str):
+        db.execute("UPDATE pages SET used_at = ?, hits = hits + 1 WHERE id = ?", (time.time(), page_id))
+        return text, json.loads(confidence) if confidence else None
+
+    def lookup(self, key: dict):
+        """(text, confidence stats) of the same page seen before (see page_key), or None."""
+        try:
+            db = self._db()
+            row = db.execute(
+                "SELECT id, text, confidence FROM pages WHERE fingerprint = ? AND digest = ? LIMIT 1",
+                (self.fingerprint, key["digest"]),
+            ).fetchone()
+            if row is not None:
+                return self._hit(db, *row)
+
+            if key["ink"] < NEAR_MATCH_MIN_INK:
+                return None
+
+            with self._lock:
+                self._refresh()
+                if not len(self._ids):
+                    return None
+
+                query = np.frombuffer(key["hash"], dtype=np.uint8)
+                aspect = key["aspect"]
+                distances = POPCOUNT[np.bitwise_xor(self._hashes, query)].sum(axis=1, dtype=np.uint16)
+                close = (distances <= self.max_distance) & (np.abs(self._aspects - aspect) <= MAX_ASPECT_DIFF * aspect)
+                candidates = self._ids[close][np.argsort(distances[close], kind="stable")]
+
+            for page_id in candidates.tolist():
+                row = db.execute("SELECT height, width, bits, text, confidence FROM pages WHERE id = ?", (page_id,)).fetchone()
+                if row is None or row[2] is None:
+                    continue  # evicted by another process
+                if same_page(key, row[0], row[1], row[2]):
+                    return self._hit(db, page_id, row[3], row[4])
+        except sqlite3.Error as e:
+            logger.warning(f"Page cache lookup failed: {e}")
+        return None
+
+    def store(self, key: dict, text: str, confidence: dict = None):
+        try:
+            now = time.time()
+            height, width = key["shape"]
+            db = self._db()
+            cursor = db.execute(
+                "INSERT INTO pages (fingerprint, hash, aspect, text, confidence, digest, height, width, bits, created_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self.fingerprint, key["hash"], key["aspect"], text,
+                    json.dumps(confidence) if confidence else None,
+                    key["digest"], height, width, zlib.compress(key["bits"], 6),
+                    now, now,
+                ),
+            )
+            if cursor.lastrowid % EVICT_EVERY == 0:
+                self.evict()
+        except sqlite3.Error as e:
+            logger.warning(f"Page cache store failed: {e}")
+
+    def evict(self) -> int:
+        """Drops pages from other pipeline versions, then the least recently used beyond max_entries."""
+        db = self._db()
+        removed = db.execute("DELETE FROM pages WHERE fingerprint != ?", (self.fingerprint,)).rowcount
+        removed += db.execute(
+            "DELETE FROM pages WHERE id IN (SELECT id FROM pages ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        ).rowcount
+        if removed:
+            logger.info(f"Page cache evicted {removed} pages")
+        return removed
+
+    def clear(self) -> int:
+        removed = self._db().execute("DELETE FROM pages").rowcount
+        with self._lock:
+            self._reset_index()
+        return removed
+
+    def stats(self) -> dict:
+        entries, hits = self._db().execute(
+            "SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM pages WHERE fingerprint = ?",
+            (self.fingerprint,),
+        ).fetchone()
+        return {
+            "entries": entries,
+            "hits": hits,
+            "maxEntries": self.max_entries,
+            "maxDistance": self.max_distance,
+            "sizeBytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            "fingerprint": self.fingerprint,
+        }
+
+
+page_cache = PageCache(PAGE_CACHE_PATH, PAGE_CACHE_MAX_DISTANCE, PAGE_CACHE_MAX_ENTRIES)
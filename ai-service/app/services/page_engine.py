@@ -0,0 +1,197 @@
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from collections import deque
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from app.core.config import OCR_WORKERS, OCR_PAGE_TIMEOUT, OCR_MAX_IN_FLIGHT
+from app.core.admission import cpu_share
+
+logger = logging.getLogger(__name__)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+_EXHAUSTED = object()
+
+# Submissions of one page before it counts as having crashed its worker
+MAX_PAGE_ATTEMPTS = 3
+
+# Set while a request is being profiled: its pages must run in-process
+# so the profiler sees them
+_force_inline = contextvars.ContextVar("force_inline", default=False)
+
+
+@contextmanager
+def pages_inline():
+    """map_pages calls inside this block run on the calling thread."""
+    token = _force_inline.set(True)
+    try:
+        yield
+    finally:
+        _force_inline.reset(token)
+
+
+def get_worker_count() -> int:
+    if OCR_WORKERS > 0:
+        return OCR_WORKERS
+    # Every web worker has its own pool: share the cores between them
+    return cpu_share()
+
+
+def get_page_pool() -> ProcessPoolExecutor:
+    """Shared worker pool, created on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=get_worker_count())
+        return _pool
+
+
+def reset_page_pool(broken: ProcessPoolExecutor = None):
+    """Drop the pool (e.g. after a worker crashed) so the next call starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and (broken is None or _pool is broken):
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def kill_page_pool(stuck: ProcessPoolExecutor):
+    """
+    Drops the pool and terminates its workers, for a page stuck in one
+    of them (a running future cannot be cancelled, and a pool cannot
+    lose a single worker without breaking). Every document's unfinished
+    pages on this pool then fail as BrokenProcessPool or CancelledError,
+    and map_pages resubmits them to the next pool.
+    """
+    processes = list((getattr(stuck, "_processes", None) or {}).values())
+    reset_page_pool(stuck)
+    for process in processes:
+        process.terminate()
+
+
+def _resubmit(pool: ProcessPoolExecutor, fn, pending):
+    """Resubmits the pending pages that had not finished successfully."""
+    for item in pending:
+        f = item[1]
+        if not f.done() or f.cancelled() or f.exception() is not None:
+            item[1] = pool.submit(fn, item[0])
+            item[2] += 1
+
+
+def _wait(future):
+    """
+    The page's result, or FutureTimeoutError once it has been running for
+    OCR_PAGE_TIMEOUT. Time spent queued (behind other documents' pages,
+    or a pool restart) does not count.
+    """
+    started = None
+    while True:
+        if started is None:
+            timeout = 0.5
+        else:
+            timeout = max(0.0, min(0.5, started + OCR_PAGE_TIMEOUT - time.monotonic()))
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            if started is None:
+                if future.running():
+                    started = time.monotonic()
+            elif time.monotonic() >= started + OCR_PAGE_TIMEOUT:
+                raise
+
+
+def _run_inline(fn, pages):
+    for page in pages:
+        try:
+            yield fn(page), None
+        except Exception as e:
+            yield None, str(e) or type(e).__name__
+
+
+def map_pages(fn, pages, max_in_flight: int = None):
+    """
+    Runs fn(page) for every page on the worker pool.
+
+    `pages` may be a lazy iterator: at most `max_in_flight` pages are
+    submitted ahead of the one being collected, so memory stays bounded.
+
+    Yields (result, error) tuples in page order; error is a non-empty
+    string or None. A page that raises or runs past OCR_PAGE_TIMEOUT
+    yields (None, error) instead of failing the whole document. A page
+    that timed out while running takes the pool down with it, so the
+    stuck worker does not outlive the request. Pages that lose their
+    pool (a crash, or another document's stuck page) are resubmitted,
+    up to MAX_PAGE_ATTEMPTS times each.
+    """
+    if get_worker_count() <= 1 or _force_inline.get():
+        yield from _run_inline(fn, pages)
+        return
+
+    max_in_flight = max_in_flight or OCR_MAX_IN_FLIGHT or get_worker_count() * 2
+
+    pool = get_page_pool()
+    pages = iter(pages)
+    pending = deque()  # [page, future, attempts]
+    index = 0
+
+    while True:
+        while len(pending) < max_in_flight:
+            page = next(pages, _EXHAUSTED)
+            if page is _EXHAUSTED:
+                break
+            pending.append([page, pool.submit(fn, page), 1])
+
+        if not pending:
+            return
+
+        future, attempts = pending[0][1], pending[0][2]
+
+        try:
+            result = _wait(future)
+
+        except FutureTimeoutError:
+            pending.popleft()
+            index += 1
+            logger.warning(f"Page {index} timed out after {OCR_PAGE_TIMEOUT:.0f}s")
+            if not future.cancel():
+                # Still running: only killing its worker stops it
+                logger.warning(f"Page {index} is stuck in a worker. Restarting pool...")
+                kill_page_pool(pool)
+                pool = get_page_pool()
+                _resubmit(pool, fn, pending)
+            yield None, "timeout"
+            continue
+
+        except (BrokenProcessPool, CancelledError):
+            # The pool went down under this page: a worker died (e.g.
+            # OOM-killed) or another document's stuck page was killed.
+            # Restart it (once, whichever document notices first) and
+            # resubmit every unfinished page, this one included.
+            logger.error(f"OCR pool lost page {index + 1}. Restarting pool...")
+            reset_page_pool(pool)
+            pool = get_page_pool()
+            if attempts >= MAX_PAGE_ATTEMPTS:
+                pending.popleft()
+                index += 1
+                _resubmit(pool, fn, pending)
+                yield None, "worker crashed"
+            else:
+                _resubmit(pool, fn, pending)
+            continue
+
+        except Exception as e:
+            pending.popleft()
+            index += 1
+            logger.error(f"Page {index} failed: {e}")
+            yield None, str(e) or type(e).__name__
+            continue
+
+        pending.popleft()
+        index += 1
+        yield result, None
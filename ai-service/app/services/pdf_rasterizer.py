@@ -0,0 +1,59 @@
+import tempfile
+from contextlib import contextmanager
+
+import numpy as np
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+from app.core.config import PDF_DPI, PDF_RASTER_WINDOW
+from app.core.metrics import track_stage
+
+
+def get_pdf_page_count(pdf_path: str) -> int:
+    return int(pdfinfo_from_path(pdf_path)["Pages"])
+
+
+def iter_page_windows(page_numbers: list[int], window: int):
+    """Groups sorted page numbers into contiguous runs of at most `window` pages."""
+    run = []
+    for n in page_numbers:
+        if run and (n != run[-1] + 1 or len(run) >= window):
+            yield run
+            run = []
+        run.append(n)
+    if run:
+        yield run
+
+
+def iter_pdf_pages(pdf_path: str, page_numbers: list[int] = None, dpi: int = PDF_DPI, window: int = PDF_RASTER_WINDOW):
+    """
+    Renders a PDF a few pages at a time.
+
+    Yields (page_number, grayscale ndarray) so that only `window` rendered
+    pages are alive at once, however long the document is.
+    """
+    if page_numbers is None:
+        page_numbers = range(1, get_pdf_page_count(pdf_path) + 1)
+
+    for run in iter_page_windows(sorted(page_numbers), max(1, window)):
+        with track_stage("rasterize", pages=len(run)):
+            images = convert_from_path(
+                pdf_path,
+                dpi=dpi,
+                first_page=run[0],
+                last_page=run[-1],
+                grayscale=True,
+            )
+
+        for n, img in zip(run, images):
+            yield n, np.asarray(img)
+
+        del images
+
+
+@contextmanager
+def pdf_temp_file(pdf_bytes: bytes):
+    """Spills PDF bytes to a temp file once so poppler/pdfplumber can share it."""
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as f:
+        f.write(pdf_bytes)
+        f.flush()
+        yield f.name
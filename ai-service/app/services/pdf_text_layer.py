@@ -0,0 +1,136 @@
+import logging
+import re
+
+import pdfplumber
+from pdfminer.converter import PDFLayoutAnalyzer
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+
+from app.core.config import (
+    TEXT_LAYER_MIN_CHARS,
+    TEXT_LAYER_MAX_IMAGE_COVERAGE,
+    TEXT_LAYER_MARGIN,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Glyphs pdfminer could not map to unicode come out as "(cid:123)"
+CID_PATTERN = re.compile(r"\(cid:\d+\)")
+
+
+def is_usable_text(text: str, min_chars: int = TEXT_LAYER_MIN_CHARS) -> bool:
+    """
+    Decides whether an embedded text layer can replace OCR for a page.
+    Rejects empty/near-empty layers and layers that are mostly
+    unmapped glyphs or symbols (broken font encodings).
+    """
+    if not text:
+        return False
+
+    if len(CID_PATTERN.findall(text)) > 3:
+        return False
+
+    visible = re.sub(r"\s+", "", text)
+    if len(visible) < min_chars:
+        return False
+
+    letters = sum(ch.isalpha() for ch in visible)
+    return letters / len(visible) >= 0.5
+
+
+def image_coverage(page) -> float:
+    """Share of the page area covered by its images (clipped to the page)."""
+    page_area = float(page.width * page.height)
+    if page_area <= 0:
+        return 0.0
+
+    covered = 0.0
+    for image in page.images:
+        width = min(image["x1"], page.width) - max(image["x0"], 0)
+        height = min(image["bottom"], page.height) - max(image["top"], 0)
+        if width > 0 and height > 0:
+            covered += width * height
+    return min(1.0, covered / page_area)
+
+
+# Text render modes that paint nothing: 3 is the invisible layer OCR
+# tools put over a scan, 7 only adds the glyphs to the clipping path
+INVISIBLE_RENDER_MODES = (3, 7)
+
+
+class _GlyphCollector(PDFLayoutAnalyzer):
+    """Records every glyph a page draws, with its text render mode."""
+
+    def __init__(self, rsrcmgr):
+        super().__init__(rsrcmgr)
+        self.glyphs = []
+        self._render_mode = 0
+
+    def render_string(self, textstate, seq, ncs, graphicstate):
+        self._render_mode = textstate.render
+        super().render_string(textstate, seq, ncs, graphicstate)
+
+    def render_char(self, *args):
+        adv = super().render_char(*args)
+        char = self.cur_item._objs[-1]
+        self.glyphs.append((self._render_mode, char.get_text(), char.bbox))
+        return adv
+
+    def receive_layout(self, ltpage):
+        pass
+
+
+def _page_glyphs(page) -> list:
+    """(render mode, text, bbox) for every glyph on a pdfplumber page."""
+    device = _GlyphCollector(PDFResourceManager())
+    PDFPageInterpreter(device.rsrcmgr, device).process_page(page.page_obj)
+    return device.glyphs
+
+
+def is_scanned_page(page, text: str) -> bool:
+    """
+    A page dominated by images whose text layer is not its content: a
+    scan under an invisible OCR layer, with glyphs that map to nothing,
+    or with only a header/footer ("Scanned with ...") drawn on top.
+    Slides and brochures with visible text over a background image keep
+    their text layer.
+    """
+    if image_coverage(page) <= TEXT_LAYER_MAX_IMAGE_COVERAGE:
+        return False
+
+    x0, y0, x1, y1 = page.page_obj.mediabox
+    band = (y1 - y0) * TEXT_LAYER_MARGIN
+
+    readable = 0
+    for mode, glyph, (_, bottom, _, top) in _page_glyphs(page):
+        if mode in INVISIBLE_RENDER_MODES or glyph.isspace() or CID_PATTERN.fullmatch(glyph):
+            continue
+        middle = (bottom + top) / 2
+        if y0 + band <= middle <= y1 - band:
+            readable += 1
+
+    return readable < TEXT_LAYER_MIN_CHARS
+
+
+def extract_text_layer(pdf_path: str) -> list:
+    """
+    Returns one entry per page: the embedded text when it is usable,
+    otherwise None (the page needs OCR).
+    """
+    texts = []
+
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            try:
+                text = page.extract_text() or ""
+                usable = is_usable_text(text) and not is_scanned_page(page, text)
+            except Exception as e:
+                logger.warning(f"Text layer unreadable on page {page.page_number}: {e}")
+                text = ""
+                usable = False
+            finally:
+                page.close()
+
+            texts.append(text if usable else None)
+
+    return texts
@@ -0,0 +1,150 @@
+import unicodedata
+
+
+def generate_deletes(word: str, max_distance: int) -> set:
+    """Every string obtainable from `word` by deleting up to max_distance characters."""
+    deletes = {word}
+    frontier = {word}
+
+    for _ in range(max_distance):
+        next_frontier = set()
+        for w in frontier:
+            for i in range(len(w)):
+                next_frontier.add(w[:i] + w[i + 1:])
+        deletes |= next_frontier
+        frontier = next_frontier
+
+    return deletes
+
+
+def damerau_levenshtein(a: str, b: str) -> int:
+    """
+    Unrestricted Damerau-Levenshtein distance, i.e. the fewest inserts,
+    deletes, replaces and adjacent transposes that turn a into b. This is
+    the distance behind SpellChecker's edit_distance_1 / edit_distance_2.
+    """
+    inf = len(a) + len(b)
+    last_row = {}
+
+    rows = [[inf] * (len(b) + 2) for _ in range(len(a) + 2)]
+    for i in range(len(a) + 1):
+        rows[i + 1][0] = inf
+        rows[i + 1][1] = i
+    for j in range(len(b) + 1):
+        rows[0][j + 1] = inf
+        rows[1][j + 1] = j
+
+    for i in range(1, len(a) + 1):
+        last_match_col = 0
+        for j in range(1, len(b) + 1):
+            k = last_row.get(b[j - 1], 0)
+            l = last_match_col
+            cost = 1
+            if a[i - 1] == b[j - 1]:
+                cost = 0
+                last_match_col = j
+            rows[i + 1][j + 1] = min(
+                rows[i][j] + cost,
+                rows[i + 1][j] + 1,
+                rows[i][j + 1] + 1,
+                rows[k][l] + (i - k - 1) + 1 + (j - l - 1),
+            )
+        last_row[a[i - 1]] = i
+
+    return rows[len(a) + 1][len(b) + 1]
+
+
+def remove_diacritics(word: str) -> str:
+    return "".join(
+        ch for ch in unicodedata.normalize("NFKD", word)
+        if not unicodedata.combining(ch)
+    )
+
+
+class SymmetricDeleteIndex:
+    """
+    Symmetric-delete lookup over a SpellChecker dictionary.
+
+    Instead of generating every edit of the query (SpellChecker builds
+    hundreds of thousands of strings for distance 2), the deletes of each
+    dictionary word's prefix are indexed once; a query only expands its
+    own prefix deletes and verifies the few words they point to.
+
+    correction() follows SpellChecker.correction: known words are
+    returned as is, distance-1 candidates win over distance-2 ones,
+    candidates that only differ in accents are preferred, then the most
+    frequent word wins (ties broken alphabetically).
+    """
+
+    def __init__(self, spell, max_distance: int = 2, prefix_length: int = 6):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+
+        word_frequency = spell.word_frequency
+        self.frequencies = word_frequency.dictionary
+        self.longest_word_length = word_frequency.longest_word_length
+
+        self.deletes = {}
+        for word in self.frequencies:
+            if not self._should_check(word):
+                continue
+            for d in generate_deletes(word[:prefix_length], max_distance):
+                bucket = self.deletes.get(d)
+                if bucket is None:
+                    self.deletes[d] = [word]
+                else:
+                    bucket.append(word)
+
+    def _should_check(self, word: str) -> bool:
+        # Same rules as SpellChecker._check_if_should_check
+        if len(word) > self.longest_word_length + 3:
+            return False
+        if word in ("nan", "inf", "infinity"):
+            return True
+        try:
+            float(word)
+            return False
+        except ValueError:
+            return True
+
+    def candidates(self, word: str):
+        """Dictionary words at the smallest distance (1 or 2) from word, or None."""
+        if word in self.frequencies and self._should_check(word):
+            return {word}
+
+        if not self._should_check(word):
+            return {word}
+
+        seen = set()
+        by_distance = [set() for _ in range(self.max_distance + 1)]
+
+        for d in generate_deletes(word[:self.prefix_length], self.max_distance):
+            for candidate in self.deletes.get(d, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+
+                if abs(len(candidate) - len(word)) > self.max_distance:
+                    continue
+
+                distance = damerau_levenshtein(word, candidate)
+                if distance <= self.max_distance:
+                    by_distance[distance].add(candidate)
+
+        for found in by_distance[1:]:
+            if found:
+                return found
+        return None
+
+    def correction(self, word: str):
+        word = word.lower()
+        candidates = self.candidates(word)
+        if not candidates:
+            return None
+
+        word_no_accents = remove_diacritics(word)
+        accent_matches = [c for c in candidates if remove_diacritics(c) == word_no_accents]
+        if accent_matches:
+            candidates = accent_matches
+
+        return max(sorted(candidates), key=lambda c: self.frequencies[c])
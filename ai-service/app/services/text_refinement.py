@@ -1,8 +1,34 @@
 import re
-import nltk
-from spellchecker import SpellChecker
+import threading
+from functools import lru_cache
 
-spell = SpellChecker()
+from app.core.config import SPELL_PREFIX_LENGTH, SPELL_CACHE_SIZE
+from app.core.metrics import track_stage
+from app.services.spell_index import SymmetricDeleteIndex
+
+_spell_index = None
+_spell_index_lock = threading.Lock()
+
+
+def get_spell_index() -> SymmetricDeleteIndex:
+    """
+    Loads the SpellChecker dictionary and builds the symmetric-delete
+    index on first use (a few seconds, once per process).
+    """
+    global _spell_index
+    with _spell_index_lock:
+        if _spell_index is None:
+            from spellchecker import SpellChecker
+
+            _spell_index = SymmetricDeleteIndex(SpellChecker(), prefix_length=SPELL_PREFIX_LENGTH)
+        return _spell_index
+
+
+def load_sentence_tokenizer():
+    """Imports nltk and loads the punkt model, which the first sent_tokenize call does lazily."""
+    import nltk
+
+    nltk.sent_tokenize("Warm up. Done.")
 
 
 # STEP 1: BASIC CLEANING
@@ -15,19 +41,36 @@ def basic_clean(text: str) -> str:
 
 
 # STEP 2: SPELL CORRECTION
+@lru_cache(maxsize=SPELL_CACHE_SIZE)
+def correct_word(word: str) -> str:
+    # Shared across requests; same result as spell.correction(word) or word
+    return get_spell_index().correction(word) or word
+
+
 def correct_spelling(text: str) -> str:
+    index = get_spell_index()
+    corrections = {}
+
     corrected_words = []
     for word in text.split():
-        if word.isalpha():
-            corrected_words.append(spell.correction(word) or word)
-        else:
+        if not word.isalpha() or word in index.frequencies:
             corrected_words.append(word)
+            continue
+
+        # Each unique token is corrected once per document
+        fixed = corrections.get(word)
+        if fixed is None:
+            fixed = corrections[word] = correct_word(word)
+        corrected_words.append(fixed)
+
     return " ".join(corrected_words)
 
 
 
 # STEP 3: SENTENCE REBUILDING
 def rebuild_sentences(text: str) -> str:
+    import nltk
+
     sentences = nltk.sent_tokenize(text)
     return "\n".join(sentences)
 
@@ -53,7 +96,12 @@ def detect_headings(text: str) -> str:
 # FULL PIPELINE
 def refine_text(raw_text: str) -> str:
     text = basic_clean(raw_text)
-    text = correct_spelling(text)
-    text = rebuild_sentences(text)
+
+    with track_stage("spell", size=len(text)):
+        text = correct_spelling(text)
+
+    with track_stage("sentences", size=len(text)):
+        text = rebuild_sentences(text)
+
     text = detect_headings(text)
     return text
@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+import time
+
+
+class DiskCache:
+    """
+    Small JSON-on-disk key/value store.
+
+    - One file per key, written atomically (tmp file + os.replace),
+      so several worker processes can share the directory.
+    - File mtime doubles as the LRU clock: reads touch the entry,
+      eviction drops the least recently used files once the directory
+      grows past max_bytes.
+    - With ttl (seconds), entries older than ttl read as misses and are
+      removed.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, ttl: float = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._size = None
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+    def _read(self, path: str):
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        return entry["createdAt"], entry["value"]
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            created_at, value = self._read(path)
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if self.ttl is not None and time.time() - created_at > self.ttl:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except FileNotFoundError:
+                size = 0
+            with self._lock:
+                self.misses += 1
+                self.expired += 1
+                if self._size is not None:
+                    self._size -= size
+            return None
+
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"createdAt": time.time(), "value": value}, f)
+        size = os.path.getsize(tmp)
+        # Overwriting a key replaces its old file rather than adding to it
+        try:
+            replaced = os.path.getsize(path)
+        except FileNotFoundError:
+            replaced = 0
+        os.replace(tmp, path)
+
+        with self._lock:
+            self.writes += 1
+            if self._size is None:
+                self._size = sum(s for _, s, _ in self._entries())
+            else:
+                self._size += size - replaced
+            over_budget = self._size > self.max_bytes
+
+        if over_budget:
+            self.evict()
+
+    def evict(self):
+        """Drops least recently used entries until the cache is below 90% of max_bytes."""
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda e: e[2])
+            total = sum(size for _, size, _ in entries)
+            target = self.max_bytes * 0.9
+
+            for path, size, _ in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                self.evictions += 1
+
+            self._size = total
+
+    def delete_where(self, predicate) -> int:
+        """Removes every entry whose value matches predicate(value)."""
+        removed = 0
+        for path, _, _ in list(self._entries()):
+            try:
+                _, value = self._read(path)
+                matches = predicate(value)
+            except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+                matches = True  # unreadable entries always go
+            if matches:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+
+        with self._lock:
+            self._size = None
+        return removed
+
+    def clear(self) -> int:
+        return self.delete_where(lambda value: True)
+
+    def stats(self) -> dict:
+        entries = list(self._entries())
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(entries),
+                "bytes": sum(size for _, size, _ in entries),
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "expired": self.expired,
+                "ttlSeconds": self.ttl,
+            }
@@ -2,6 +2,9 @@ import cv2
 import numpy as np
 from PIL import Image
 import io
+import time
+
+from app.core.config import PREPROCESS_MODE, OCR_TARGET_DPI, OCR_TARGET_GLYPH_PX, OCR_PAGE_ROI, OCR_BLANK_INK_RATIO
 
 
 def pil_to_cv2(pil_img: Image.Image):
@@ -24,7 +27,45 @@ def remove_alpha_channel(pil_img: Image.Image):
     return pil_img.convert("RGB")
 
 
-def preprocess_image_for_ocr(image_bytes: bytes):
+def load_grayscale(image):
+    """
+    Accepts encoded image bytes or an already decoded ndarray
+    (grayscale, or RGB as rendered by pdf2image) and returns grayscale.
+    """
+    if isinstance(image, np.ndarray):
+        if image.ndim == 2:
+            return image
+        if image.shape[2] == 4:
+            image = np.asarray(remove_alpha_channel(Image.fromarray(image)))
+        return cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+
+    # Load image
+    pil_img = Image.open(io.BytesIO(image))
+
+    # 9. Transparency
+    pil_img = remove_alpha_channel(pil_img)
+
+    # Convert to OpenCV
+    img = pil_to_cv2(pil_img)
+
+    # Convert to grayscale
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+
+def step_timer(timings: dict = None):
+    """Returns mark(step): records ms elapsed since the previous mark into timings."""
+    last = [time.perf_counter()]
+
+    def mark(step: str):
+        now = time.perf_counter()
+        if timings is not None:
+            timings[step] = round((now - last[0]) * 1000, 2)
+        last[0] = now
+
+    return mark
+
+
+def preprocess_image_for_ocr(image, dpi: int = None, timings: dict = None, as_array: bool = False, page_info: dict = None):
     """
     Full OCR preprocessing pipeline:
     1. Inverted Images
@@ -36,30 +77,64 @@ def preprocess_image_for_ocr(image_bytes: bytes):
     7. Removing Borders
     8. Missing Borders
     9. Transparency / Alpha Channel
+
+    `image` is either encoded image bytes or a decoded ndarray.
+    `dpi` is the render resolution when known (PDF pages).
+    If `timings` is given, it is filled with milliseconds per step.
+    With `as_array`, the binarized uint8 ndarray is returned instead of
+    a PIL image.
+    If `page_info` is given, it gets "blank": True for pages with no
+    text (nothing worth OCR-ing), or "crop": [left, top, right, bottom]
+    (fractions of the page) for the region that was kept.
     """
+    mark = step_timer(timings)
 
-    # Load image
-    pil_img = Image.open(io.BytesIO(image_bytes))
+    gray = load_grayscale(image)
+    mark("load")
 
-    # 9. Transparency
-    pil_img = remove_alpha_channel(pil_img)
+    if PREPROCESS_MODE == "legacy":
+        thresh = _preprocess_legacy(gray, mark)
+    else:
+        owned = gray is not image and gray.flags.writeable
+        thresh = _preprocess_fast(gray, dpi, mark, owned)
 
-    # Convert to OpenCV
-    img = pil_to_cv2(pil_img)
+    # 7. Removing Borders: crop to the detected text blocks
+    if OCR_PAGE_ROI:
+        region = find_text_region(thresh)
+        if region is None:
+            if page_info is not None:
+                page_info["blank"] = True
+        else:
+            thresh, crop = crop_to_region(thresh, region)
+            if page_info is not None:
+                page_info["crop"] = crop
+    else:
+        thresh = remove_borders(thresh)
 
-    # Convert to grayscale
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    if as_array:
+        mark("borders")
+        return thresh
 
+    # Return PIL image
+    final_pil = Image.fromarray(thresh)
+    mark("borders")
+    return final_pil
+
+
+def _preprocess_legacy(gray, mark):
     # 2. Rescaling (very important)
     scale_factor = 2
     gray = cv2.resize(gray, None, fx=scale_factor, fy=scale_factor, interpolation=cv2.INTER_CUBIC)
+    mark("rescale")
 
     # 1. Inverted Images detection (if background is dark)
     if np.mean(gray) < 127:
         gray = cv2.bitwise_not(gray)
+    mark("invert")
 
     # 4. Noise removal (before threshold)
     gray = cv2.GaussianBlur(gray, (3, 3), 0)
+    mark("denoise")
 
     # 3. Binarization (Adaptive threshold works best for notes)
     thresh = cv2.adaptiveThreshold(
@@ -68,11 +143,13 @@ def preprocess_image_for_ocr(image_bytes: bytes):
         cv2.THRESH_BINARY,
         31, 10
     )
+    mark("binarize")
 
     # 5. Dilation and erosion (clean broken characters)
     kernel = np.ones((2, 2), np.uint8)
     thresh = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel, iterations=1)
     thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel, iterations=1)
+    mark("morphology")
 
     # 6. Deskew
     coords = np.column_stack(np.where(thresh < 255))
@@ -88,13 +165,243 @@ def preprocess_image_for_ocr(image_bytes: bytes):
         center = (w // 2, h // 2)
         M = cv2.getRotationMatrix2D(center, angle, 1.0)
         thresh = cv2.warpAffine(thresh, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+    mark("deskew")
 
-    # 7. Removing Borders
-    thresh = remove_borders(thresh)
+    return thresh
 
-    # Return PIL image
-    final_pil = Image.fromarray(thresh)
-    return final_pil
+
+def _preprocess_fast(gray, dpi, mark, owned: bool):
+    # 2. Rescaling, only as much as the source needs
+    scale = choose_scale(gray, dpi)
+    if scale != 1.0:
+        interpolation = cv2.INTER_CUBIC if scale > 1 else cv2.INTER_AREA
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=interpolation)
+    elif not owned:
+        # Steps below work in place; never write into the caller's array
+        gray = gray.copy()
+    mark("rescale")
+
+    # 1. Inverted Images detection (if background is dark)
+    if cv2.mean(gray)[0] < 127:
+        cv2.bitwise_not(gray, dst=gray)
+    mark("invert")
+
+    # 4. Noise removal (before threshold), in place
+    cv2.GaussianBlur(gray, (3, 3), 0, dst=gray)
+    mark("denoise")
+
+    # 3. Binarization
+    thresh = cv2.adaptiveThreshold(
+        gray, 255,
+        cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+        cv2.THRESH_BINARY,
+        31, 10
+    )
+    del gray
+    mark("binarize")
+
+    # 5. Dilation and erosion, reusing the threshold buffer
+    kernel = np.ones((2, 2), np.uint8)
+    cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel, dst=thresh, iterations=1)
+    cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel, dst=thresh, iterations=1)
+    mark("morphology")
+
+    # 6. Deskew, angle estimated on a downsampled copy
+    angle = estimate_skew(thresh)
+    if angle is not None and abs(angle) >= 0.1:
+        (h, w) = thresh.shape[:2]
+        center = (w // 2, h // 2)
+        M = cv2.getRotationMatrix2D(center, angle, 1.0)
+        thresh = cv2.warpAffine(thresh, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+    mark("deskew")
+
+    return thresh
+
+
+def downsample(img, max_side: int):
+    """Returns (copy no larger than max_side, factor applied)."""
+    h, w = img.shape[:2]
+    factor = min(1.0, max_side / max(h, w))
+    if factor == 1.0:
+        return img, 1.0
+    return cv2.resize(img, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA), factor
+
+
+def estimate_glyph_height(gray):
+    """Median height (px) of character-sized connected components, or None."""
+    small, factor = downsample(gray, 1600)
+
+    _, binary = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    if cv2.mean(binary)[0] > 127:
+        # Dark background: text is the light part
+        cv2.bitwise_not(binary, dst=binary)
+
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+
+    # Drop specks, lines and blobs
+    glyphs = heights[(heights >= 3) & (heights <= small.shape[0] // 8) & (widths <= heights * 3)]
+    if len(glyphs) < 20:
+        return None
+
+    return float(np.median(glyphs)) / factor
+
+
+def choose_scale(gray, dpi: int = None) -> float:
+    """
+    Scale factor that brings text to a size Tesseract reads well:
+    from the render DPI when known, otherwise from the measured glyph height.
+    """
+    if dpi:
+        scale = OCR_TARGET_DPI / dpi
+    else:
+        glyph_height = estimate_glyph_height(gray)
+        if glyph_height is None:
+            return 2.0  # nothing measurable, behave like the legacy pipeline
+        scale = OCR_TARGET_GLYPH_PX / glyph_height
+
+    scale = min(2.0, max(0.5, scale))
+
+    # Within 10% of the target is close enough, skip the resize
+    if abs(scale - 1.0) < 0.1:
+        return 1.0
+    return round(scale, 2)
+
+
+def estimate_skew(thresh):
+    """
+    Skew angle (degrees, same sign convention as the legacy deskew)
+    measured on a downsampled copy, or None if there is too little ink.
+    """
+    small, factor = downsample(thresh, 1024)
+
+    _, ink = cv2.threshold(small, 127, 255, cv2.THRESH_BINARY_INV)
+    points = cv2.findNonZero(ink)
+    if points is None or len(points) < max(50, int(1000 * factor * factor)):
+        return None
+
+    # Legacy deskew measured (row, col) points; keep that orientation
+    points = np.ascontiguousarray(points.reshape(-1, 2)[:, ::-1])
+    angle = cv2.minAreaRect(points)[-1]
+
+    if angle < -45:
+        angle = -(90 + angle)
+    else:
+        angle = -angle
+
+    # OpenCV >= 4.5 reports (0, 90] instead of [-90, 0); fold into (-45, 45]
+    if angle > 45:
+        angle -= 90
+    elif angle <= -45:
+        angle += 90
+
+    return angle
+
+
+# Scanner edges: border strips at most this fraction of the page thick
+# with ink along at least this share of their length, or border blocks
+# with more than this share of solid ink
+EDGE_STRIP_MAX = 0.05
+EDGE_STRIP_COVERAGE = 0.97
+EDGE_SOLID_FILL = 0.8
+
+
+def _is_edge_strip(ink) -> bool:
+    """
+    Whether one block's ink (full-page mask) is scanner edge lines: nearly
+    all of it within EDGE_STRIP_MAX of the page border, running unbroken
+    along more than half of a side. Text that reaches the border has
+    gaps between letters and words, and most of it lies further in.
+    """
+    h, w = ink.shape
+    th, tw = max(1, int(h * EDGE_STRIP_MAX)), max(1, int(w * EDGE_STRIP_MAX))
+    total = np.count_nonzero(ink)
+    bands = {
+        "top": (ink[:th], 0),
+        "bottom": (ink[h - th:], 0),
+        "left": (ink[:, :tw], 1),
+        "right": (ink[:, w - tw:], 1),
+    }
+
+    border = np.zeros_like(ink)
+    border[:th] = border[h - th:] = 1
+    border[:, :tw] = border[:, w - tw:] = 1
+    if np.count_nonzero(ink & border) < 0.9 * total:
+        return False
+
+    for band, axis in bands.values():
+        along = band.any(axis=axis)  # per column (top/bottom) or row (left/right)
+        ends = np.flatnonzero(along)
+        if not len(ends) or ends[-1] - ends[0] < 0.5 * len(along):
+            continue
+        if along[ends[0]:ends[-1] + 1].mean() >= EDGE_STRIP_COVERAGE:
+            return True
+    return False
+
+
+def find_text_region(thresh):
+    """
+    Bounding box (x0, y0, x1, y1) of the text blocks on a binarized page
+    (black ink on white), or None when the page is effectively blank.
+
+    Works on a downsampled copy: ink is smeared into blocks, then blocks
+    that are specks or scanner edges are dropped. A scanner edge touches
+    the border, runs along most of it, and is either a thin strip or
+    almost solid ink; text that runs to the border (tight crops, phone
+    photos) is neither.
+    """
+    small, factor = downsample(thresh, 1000)
+    # Any ink in a downsampled cell counts, so thin strokes are not averaged away
+    ink = (small < 250).astype(np.uint8)
+    h, w = ink.shape
+
+    blocks = cv2.dilate(ink, np.ones((5, 5), np.uint8))
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(blocks, connectivity=8)
+
+    x, y = stats[1:, cv2.CC_STAT_LEFT], stats[1:, cv2.CC_STAT_TOP]
+    bw, bh = stats[1:, cv2.CC_STAT_WIDTH], stats[1:, cv2.CC_STAT_HEIGHT]
+
+    # Share of each block's bounding box that is actual ink (not smear);
+    # border blocks that are nearly solid are shadows or scanner lids
+    fill = np.bincount(labels[ink > 0], minlength=count)[1:] / np.maximum(bw * bh, 1)
+
+    touches_edge = (x == 0) | (y == 0) | (x + bw == w) | (y + bh == h)
+    large = (bw > w * 0.5) | (bh > h * 0.5)
+    edge_artifact = touches_edge & large & (fill > EDGE_SOLID_FILL)
+    for i in np.flatnonzero(touches_edge & large & ~edge_artifact):
+        edge_artifact[i] = _is_edge_strip(ink & (labels == i + 1))
+    speck = stats[1:, cv2.CC_STAT_AREA] < 50
+    keep = ~(edge_artifact | speck)
+
+    if not keep.any():
+        return None
+
+    # Ink that falls inside the kept blocks (label lookup table, label 0 is background)
+    kept = np.concatenate(([False], keep))
+    text_ink = np.count_nonzero(ink[kept[labels]])
+    if text_ink < OCR_BLANK_INK_RATIO * ink.size:
+        return None
+
+    x0, y0 = x[keep].min(), y[keep].min()
+    x1, y1 = (x + bw)[keep].max(), (y + bh)[keep].max()
+    return tuple(int(round(v / factor)) for v in (x0, y0, x1, y1))
+
+
+def crop_to_region(thresh, region):
+    """
+    8. Missing Borders: crops to region with a white margin around the
+    text. Returns (cropped, [left, top, right, bottom] as page fractions).
+    """
+    h, w = thresh.shape[:2]
+    pad = max(10, int(min(h, w) * 0.01))
+
+    x0, y0, x1, y1 = region
+    x0, y0 = max(0, x0 - pad), max(0, y0 - pad)
+    x1, y1 = min(w, x1 + pad), min(h, y1 + pad)
+
+    crop = [round(x0 / w, 3), round(y0 / h, 3), round(x1 / w, 3), round(y1 / h, 3)]
+    return thresh[y0:y1, x0:x1], crop
 
 
 def remove_borders(img):
@@ -0,0 +1,191 @@
+import logging
+import asyncio
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Refills `rate_per_minute` units per minute, holding at most `capacity`."""
+
+    def __init__(self, rate_per_minute: float, capacity: float = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available (0 if they are now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+    def state(self) -> dict:
+        self._refill(time.monotonic())
+        return {
+            "available": round(self.tokens, 1),
+            "capacity": self.capacity,
+            "ratePerMinute": round(self.rate * 60, 1),
+        }
+
+
+class RateLimiter:
+    """
+    Process-wide requests-per-minute + tokens-per-minute limiter.
+
+    Thread-safe and usable from any event loop: the lock is only held
+    for bookkeeping, waiting happens in asyncio.sleep. pause() makes
+    every caller back off together after an upstream 429.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, max_wait: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_wait = max_wait
+
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self.waiting = 0
+        self.granted = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+
+    def _reserve(self, tokens: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            wait = max(
+                self._paused_until - now,
+                self.requests.wait_time(1, now),
+                self.tokens.wait_time(tokens, now),
+            )
+            if wait <= 0:
+                self.requests.take(1)
+                self.tokens.take(tokens)
+                self.granted += 1
+            return wait
+
+    async def acquire(self, tokens: float) -> bool:
+        """
+        Waits for one request slot plus `tokens` quota.
+        Returns False (without consuming) if that would take longer than max_wait.
+        """
+        started = time.monotonic()
+        with self._lock:
+            self.waiting += 1
+
+        try:
+            while True:
+                wait = self._reserve(tokens)
+                if wait <= 0:
+                    return True
+
+                if time.monotonic() - started + wait > self.max_wait:
+                    with self._lock:
+                        self.rejected += 1
+                    return False
+
+                await asyncio.sleep(wait)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+                self.total_wait += time.monotonic() - started
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def state(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests.state(),
+                "tokens": self.tokens.state(),
+                "pausedFor": round(max(0.0, self._paused_until - time.monotonic()), 1),
+                "waiting": self.waiting,
+                "granted": self.granted,
+                "rejected": self.rejected,
+                "totalWaitSeconds": round(self.total_wait, 2),
+                "maxWaitSeconds": self.max_wait,
+            }
+
+
+class CircuitBreaker:
+    """
+    closed → open after `failure_threshold` consecutive failures.
+    open → half_open after `cooldown` seconds; one probe call is let through.
+    half_open → closed on success, back to open on failure.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+        self._lock = threading.Lock()
+        self.status = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.short_circuited = 0
+
+    def is_open(self) -> bool:
+        """True while calls are being rejected (does not claim the half-open probe)."""
+        with self._lock:
+            rejecting = self.status == "open" and time.monotonic() - self.opened_at < self.cooldown
+            if rejecting:
+                self.short_circuited += 1
+            return rejecting
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.status == "closed":
+                return True
+
+            if self.status == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+                self.status = "half_open"
+                self.probe_in_flight = False
+
+            if self.status == "half_open" and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+
+            self.short_circuited += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.status = "closed"
+            self.failures = 0
+            self.probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.status == "half_open" or self.failures >= self.failure_threshold:
+                if self.status != "open":
+                    logger.warning(f"Circuit breaker opened after {self.failures} failure(s)")
+                self.status = "open"
+                self.opened_at = time.monotonic()
+                self.probe_in_flight = False
+
+    def state(self) -> dict:
+        with self._lock:
+            retry_in = 0.0
+            if self.status == "open":
+                retry_in = max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+            return {
+                "status": self.status,
+                "consecutiveFailures": self.failures,
+                "failureThreshold": self.failure_threshold,
+                "cooldownSeconds": self.cooldown,
+                "retryInSeconds": round(retry_in, 1),
+                "shortCircuited": self.short_circuited,
+            }
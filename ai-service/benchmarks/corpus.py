@@ -0,0 +1,198 @@
+"""
+Deterministic synthetic corpus for the pipeline benchmarks.
+
+Everything is generated in memory from a seed: no downloads, no files
+checked in. The same seed always yields byte-identical documents, so
+timings and accuracy are comparable across runs and machines.
+"""
+import io
+import random
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+
+TOPICS = {
+    "Database Systems": [
+        "Normalization removes redundancy by splitting relations into smaller tables.",
+        "A transaction is atomic, consistent, isolated and durable.",
+        "Query optimization chooses the cheapest execution plan for a statement.",
+        "B+ tree indexes keep keys sorted so range scans stay efficient.",
+        "Two phase locking guarantees conflict serializable schedules.",
+    ],
+    "Operating Systems": [
+        "The scheduler decides which process runs next on each processor.",
+        "Paging maps virtual addresses to physical frames through a page table.",
+        "A deadlock needs mutual exclusion, hold and wait, no preemption and circular wait.",
+        "Semaphores coordinate access to shared resources between threads.",
+        "The translation lookaside buffer caches recent address translations.",
+    ],
+    "Computer Networks": [
+        "The transport layer provides reliable delivery with acknowledgements.",
+        "Routing protocols exchange reachability information between routers.",
+        "Congestion control reduces the sending rate when packets are lost.",
+        "The domain name system resolves host names to addresses.",
+        "Subnetting divides an address block into smaller networks.",
+    ],
+}
+
+# Page variants: what each one exercises in preprocessing
+VARIANTS = ["clean", "skew", "noise", "inverted"]
+
+DPIS = [150, 200, 300]
+
+A4_INCHES = (8.27, 11.69)
+
+
+def page_text(rng: random.Random, lines: int = 14) -> str:
+    """Notes-style text: a heading, bullet points and prose."""
+    topic = rng.choice(sorted(TOPICS))
+    sentences = TOPICS[topic]
+
+    out = [topic, ""]
+    for i in range(lines):
+        sentence = sentences[rng.randrange(len(sentences))]
+        out.append(f"- {sentence}" if i % 4 == 0 else sentence)
+    return "\n".join(out)
+
+
+def render_page(text: str, dpi: int, variant: str, rng: random.Random) -> Image.Image:
+    """Renders text as an A4 scan at dpi (11pt body), degraded per variant."""
+    width, height = int(A4_INCHES[0] * dpi), int(A4_INCHES[1] * dpi)
+    font_px = max(10, round(11 / 72 * dpi))
+    font = ImageFont.load_default(size=font_px)
+
+    img = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(img)
+
+    margin = dpi  # 1 inch
+    y = margin
+    for line in text.split("\n"):
+        draw.text((margin, y), line, fill=0, font=font)
+        y += int(font_px * 1.6)
+
+    if variant == "skew":
+        angle = rng.uniform(1.0, 3.0) * rng.choice([-1, 1])
+        img = img.rotate(angle, resample=Image.BICUBIC, fillcolor=255)
+
+    if variant == "noise":
+        arr = np.asarray(img, dtype=np.int16)
+        noise = np.random.default_rng(rng.randrange(2 ** 32)).normal(0, 18, arr.shape)
+        img = Image.fromarray(np.clip(arr + noise, 0, 255).astype(np.uint8))
+
+    if variant == "inverted":
+        img = Image.fromarray(255 - np.asarray(img))
+
+    return img
+
+
+def encode_png(img: Image.Image) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def scanned_pdf(images: list, dpi: int) -> bytes:
+    """Image-only PDF (one scan per page), as a phone/scanner app produces."""
+    buf = io.BytesIO()
+    rgb = [img.convert("RGB") for img in images]
+    # Fixed dates keep the bytes (and so the OCR cache key) reproducible
+    stamp = time.gmtime(1704067200)  # 2024-01-01
+    rgb[0].save(
+        buf, format="PDF", save_all=True, append_images=rgb[1:], resolution=dpi,
+        creationDate=stamp, modDate=stamp,
+    )
+    return buf.getvalue()
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def digital_pdf(pages: list) -> bytes:
+    """
+    Minimal PDF with a real text layer (Helvetica), one page per text.
+    Written by hand so the corpus needs nothing beyond Pillow.
+    """
+    objects = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(b"")
+    pages_obj = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    kids = []
+    for text in pages:
+        lines = " T* ".join(f"({_pdf_escape(line)}) Tj" for line in text.split("\n"))
+        stream = f"BT /F1 11 Tf 14 TL 72 770 Td {lines} ET".encode("latin-1")
+        content = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_obj, font, content)
+        ))
+
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_obj
+    objects[pages_obj - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids), len(kids)
+    )
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref))
+    return out.getvalue()
+
+
+def build_corpus(seed: int = 42, pdf_pages: int = 4) -> dict:
+    """
+    Returns {
+        "images":        [{"name", "bytes", "text", "dpi", "variant"}],
+        "scanned_pdfs":  [{"name", "bytes", "texts", "dpi"}],
+        "digital_pdfs":  [{"name", "bytes", "texts"}],
+    }
+    """
+    rng = random.Random(seed)
+    corpus = {"images": [], "scanned_pdfs": [], "digital_pdfs": []}
+
+    for dpi in DPIS:
+        for variant in VARIANTS:
+            text = page_text(rng)
+            img = render_page(text, dpi, variant, rng)
+            corpus["images"].append({
+                "name": f"page-{dpi}dpi-{variant}",
+                "bytes": encode_png(img),
+                "text": text,
+                "dpi": dpi,
+                "variant": variant,
+            })
+
+    for dpi in (200, 300):
+        texts = [page_text(rng) for _ in range(pdf_pages)]
+        images = [render_page(t, dpi, VARIANTS[i % len(VARIANTS)], rng) for i, t in enumerate(texts)]
+        corpus["scanned_pdfs"].append({
+            "name": f"scan-{pdf_pages}p-{dpi}dpi",
+            "bytes": scanned_pdf(images, dpi),
+            "texts": texts,
+            "dpi": dpi,
+        })
+
+    texts = [page_text(rng) for _ in range(pdf_pages * 2)]
+    corpus["digital_pdfs"].append({
+        "name": f"digital-{len(texts)}p",
+        "bytes": digital_pdf(texts),
+        "texts": texts,
+    })
+
+    return corpus
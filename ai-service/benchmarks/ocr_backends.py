@@ -0,0 +1,102 @@
+"""
+Compares per-page OCR overhead of the pytesseract (subprocess per page)
+and tesserocr (persistent in-process engine) backends.
+
+Usage (from ai-service/):
+    python -m benchmarks.ocr_backends [--pages 20] [--image page.png]
+
+Each page is preprocessed once up front, so only the backend call is
+timed. Without --image a synthetic text page is rendered. Backends that
+are not available here are reported and skipped.
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from app.services.ocr_service import PytesseractBackend, TesserocrBackend
+from app.utils.image_preprocessing import preprocess_image_for_ocr
+
+
+LINES = [
+    "Database normalization reduces redundancy and update anomalies.",
+    "A transaction is atomic, consistent, isolated and durable.",
+    "Query optimization chooses the cheapest execution plan.",
+    "B+ tree indexes keep keys sorted for range scans.",
+]
+
+
+def synthetic_page(width: int = 2480, height: int = 3508) -> np.ndarray:
+    """An A4 page at 300 DPI with a few paragraphs of text."""
+    img = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default(size=42)
+
+    y = 200
+    while y < height - 200:
+        for line in LINES:
+            draw.text((200, y), line, fill=0, font=font)
+            y += 70
+        y += 70
+
+    return np.asarray(img)
+
+
+def bench(backend, image: np.ndarray, pages: int) -> dict:
+    start = time.perf_counter()
+    first_text = backend.image_to_string(image)
+    first = time.perf_counter() - start
+
+    times = []
+    for _ in range(pages):
+        start = time.perf_counter()
+        backend.image_to_string(image)
+        times.append(time.perf_counter() - start)
+
+    return {
+        "first": first,
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "text": first_text,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--image", help="page image to OCR instead of the synthetic page")
+    args = parser.parse_args()
+
+    if args.image:
+        with open(args.image, "rb") as f:
+            raw = f.read()
+        image = preprocess_image_for_ocr(raw, as_array=True)
+    else:
+        image = preprocess_image_for_ocr(synthetic_page(), dpi=300, as_array=True)
+
+    print(f"Page: {image.shape[1]}x{image.shape[0]} px, {args.pages} timed runs per backend\n")
+
+    results = {}
+    for factory in (PytesseractBackend, TesserocrBackend):
+        try:
+            backend = factory()
+            results[backend.name] = bench(backend, image, args.pages)
+        except Exception as e:
+            print(f"{factory.name:<12} unavailable: {e}")
+
+    for name, r in results.items():
+        print(
+            f"{name:<12} first page {r['first'] * 1000:8.1f} ms   "
+            f"median {r['median'] * 1000:8.1f} ms   mean {r['mean'] * 1000:8.1f} ms"
+        )
+
+    if len(results) == 2:
+        a, b = results["pytesseract"], results["tesserocr"]
+        print(f"\nPer-page overhead saved: {(a['median'] - b['median']) * 1000:.1f} ms (median)")
+        print("Same text from both backends:", a["text"].strip() == b["text"].strip())
+
+
+if __name__ == "__main__":
+    main()
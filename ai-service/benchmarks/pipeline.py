@@ -0,0 +1,274 @@
+"""
+Offline benchmark for the OCR pipeline stages, on a synthetic corpus
+(benchmarks.corpus) generated from a seed. Gemini is stubbed, caches are
+off, and nothing touches the network.
+
+Usage (from ai-service/):
+    python -m benchmarks.pipeline [--repeat 3] [--stages ocr_image,refine]
+    python -m benchmarks.pipeline --update-baseline
+
+For every stage it reports latency percentiles per document, pages per
+second, peak traced Python memory and (for OCR stages) similarity to the
+ground-truth text. The first call of each stage is a warm-up (model
+loading, worker pool start-up) and is not timed.
+
+With a baseline file (benchmarks/baseline.json, written by
+--update-baseline on the machine that runs the comparison), exits with
+status 1 when a stage's p50 or p95 is more than --tolerance slower, its
+throughput more than --tolerance lower, or its accuracy more than
+--accuracy-drop lower. Stages that cannot run here (missing Tesseract,
+poppler, spaCy model...) are reported and skipped.
+"""
+import os
+
+# Before any app import: results must come from the code, not a cache
+os.environ["OCR_CACHE_ENABLED"] = "false"
+os.environ["LLM_CACHE_ENABLED"] = "false"
+os.environ["PAGE_CACHE_ENABLED"] = "false"
+
+import argparse
+import difflib
+import json
+import random
+import re
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+
+from benchmarks.corpus import build_corpus
+from app.utils.image_preprocessing import preprocess_image_for_ocr
+from app.services import gemini_refinement
+from app.services.ocr_service import extract_text_from_image, extract_text_from_pdf
+from app.services.text_refinement import refine_text
+from app.services.gemini_refinement import refine_text_with_gemini
+from app.services.concept_extraction import extract_concepts
+from app.services.page_engine import reset_page_pool
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+PAGE_MARKER_RE = re.compile(r"--- Page \d+ ---")
+
+
+# GEMINI STUB
+def stub_gemini(latency: float = 0.0):
+    """
+    Routes refine_text_with_gemini through chunking, concurrency and
+    stitching as usual, but each chunk "comes back" unchanged after
+    `latency` seconds instead of calling the API.
+    """
+    import asyncio
+
+    async def fake_call(chunk: str, label: str):
+        if latency:
+            await asyncio.sleep(latency)
+        return chunk
+
+    gemini_refinement.ENABLE_LLM = True
+    gemini_refinement.client = object()
+    gemini_refinement._client_initialized = True
+    gemini_refinement._call_gemini = fake_call
+
+
+# INPUTS
+OCR_CONFUSIONS = [("m", "rn"), ("l", "1"), ("o", "0"), ("e", "c"), ("i", "l")]
+
+
+def add_ocr_errors(text: str, rng: random.Random, rate: float = 0.03) -> str:
+    """Typical OCR confusions in about `rate` of the words."""
+    words = text.split(" ")
+    for i, word in enumerate(words):
+        if len(word) > 3 and rng.random() < rate:
+            src, dst = rng.choice(OCR_CONFUSIONS)
+            words[i] = word.replace(src, dst, 1)
+    return " ".join(words)
+
+
+def similarity(text: str, truth: str) -> float:
+    a = " ".join(PAGE_MARKER_RE.sub(" ", text).split())
+    b = " ".join(truth.split())
+    return difflib.SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+def build_stages(corpus: dict, seed: int) -> list:
+    """[(name, fn, items, pages_of(item), truth_of(item) or None)]"""
+    rng = random.Random(seed)
+    images = corpus["images"]
+    notes = [add_ocr_errors(img["text"], rng) for img in images]
+    long_notes = ["\n\n".join(notes)]  # one long document: several Gemini chunks
+
+    one = lambda item: 1
+    pdf_pages = lambda item: len(item["texts"])
+    pdf_truth = lambda item: "\n".join(item["texts"])
+
+    return [
+        ("preprocess", lambda item: preprocess_image_for_ocr(item["bytes"]), images, one, None),
+        ("ocr_image", lambda item: extract_text_from_image(item["bytes"]), images, one, lambda item: item["text"]),
+        ("ocr_pdf", lambda item: extract_text_from_pdf(item["bytes"]), corpus["scanned_pdfs"], pdf_pages, pdf_truth),
+        ("text_layer_pdf", lambda item: extract_text_from_pdf(item["bytes"]), corpus["digital_pdfs"], pdf_pages, pdf_truth),
+        ("refine", refine_text, notes, one, None),
+        ("llm_stub", refine_text_with_gemini, notes + long_notes, one, None),
+        ("concepts", extract_concepts, notes, one, None),
+    ]
+
+
+# MEASUREMENT
+def percentile(sorted_values: list, q: float) -> float:
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    return statistics.quantiles(sorted_values, n=100, method="inclusive")[int(q) - 1]
+
+
+def run_stage(fn, items: list, pages_of, truth_of, repeat: int) -> dict:
+    fn(items[0])  # warm-up, not timed
+
+    latencies = []
+    scores = []
+    total_pages = 0
+    start_all = time.perf_counter()
+
+    for r in range(repeat):
+        for item in items:
+            start = time.perf_counter()
+            output = fn(item)
+            latencies.append((time.perf_counter() - start) * 1000)
+            total_pages += pages_of(item)
+
+            if truth_of is not None and r == 0:
+                scores.append(similarity(output, truth_of(item)))
+
+    elapsed = time.perf_counter() - start_all
+
+    # Separate pass for memory: tracemalloc slows everything down
+    tracemalloc.start()
+    for item in items:
+        fn(item)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "n": len(latencies),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p90_ms": round(percentile(latencies, 90), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2),
+        "pages_per_sec": round(total_pages / elapsed, 3) if elapsed else None,
+        "peak_mib": round(peak / 2 ** 20, 2),
+        "accuracy": round(statistics.fmean(scores), 4) if scores else None,
+    }
+
+
+# BASELINE
+def compare(results: dict, baseline: dict, tolerance: float, accuracy_drop: float) -> list:
+    regressions = []
+    for name, cur in results.items():
+        base = baseline.get("stages", {}).get(name)
+        if not base or "error" in base:
+            continue
+
+        if "error" in cur:
+            regressions.append(f"{name}: ran in the baseline, now fails ({cur['error']})")
+            continue
+
+        for key in ("p50_ms", "p95_ms"):
+            if cur[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {cur[key]} > baseline {base[key]} (+{tolerance:.0%})")
+
+        if base.get("pages_per_sec") and cur["pages_per_sec"] < base["pages_per_sec"] * (1 - tolerance):
+            regressions.append(f"{name}: pages/s {cur['pages_per_sec']} < baseline {base['pages_per_sec']}")
+
+        if base.get("accuracy") is not None and cur["accuracy"] < base["accuracy"] - accuracy_drop:
+            regressions.append(f"{name}: accuracy {cur['accuracy']} < baseline {base['accuracy']}")
+
+    return regressions
+
+
+def print_table(results: dict):
+    header = f"{'stage':<15}{'n':>4}{'p50':>10}{'p90':>10}{'p95':>10}{'p99':>10}{'max':>10}{'pages/s':>10}{'peak MiB':>10}{'acc':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        if "error" in r:
+            print(f"{name:<15} skipped: {r['error']}")
+            continue
+        acc = f"{r['accuracy']:.3f}" if r["accuracy"] is not None else "-"
+        print(
+            f"{name:<15}{r['n']:>4}{r['p50_ms']:>10.1f}{r['p90_ms']:>10.1f}{r['p95_ms']:>10.1f}"
+            f"{r['p99_ms']:>10.1f}{r['max_ms']:>10.1f}{r['pages_per_sec']:>10.2f}{r['peak_mib']:>10.1f}{acc:>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--stages", help="comma-separated subset of stages")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per stubbed Gemini chunk")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--accuracy-drop", type=float, default=0.02)
+    args = parser.parse_args()
+
+    stub_gemini(args.llm_latency)
+
+    print(f"Building synthetic corpus (seed {args.seed})...")
+    corpus = build_corpus(seed=args.seed)
+    stages = build_stages(corpus, args.seed)
+
+    if args.stages:
+        wanted = set(args.stages.split(","))
+        stages = [s for s in stages if s[0] in wanted]
+
+    results = {}
+    try:
+        for name, fn, items, pages_of, truth_of in stages:
+            print(f"⏱️ {name} ({len(items)} docs x {args.repeat})")
+            try:
+                results[name] = run_stage(fn, items, pages_of, truth_of, args.repeat)
+            except Exception as e:
+                message = " ".join(str(e).replace("*", " ").split())
+                results[name] = {"error": f"{type(e).__name__}: {message[:120]}"}
+    finally:
+        reset_page_pool()
+
+    print()
+    print_table(results)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(f"\nPeak RSS: {rss:.0f} MiB (largest page worker: {children:.0f} MiB)")
+
+    meta = {"seed": args.seed, "repeat": args.repeat, "python": sys.version.split()[0]}
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "stages": results}, f, indent=2)
+        print(f"\n✅ Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("\nℹ️ No baseline yet; run with --update-baseline to record one.")
+        return
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    if baseline.get("meta", {}).get("seed") != args.seed:
+        print("\n⚠️ Baseline was recorded with a different corpus seed; comparison is not meaningful.")
+
+    regressions = compare(results, baseline, args.tolerance, args.accuracy_drop)
+    if regressions:
+        print("\n❌ Regressions against baseline:")
+        for line in regressions:
+            print(f"   {line}")
+        sys.exit(1)
+
+    print("\n✅ No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Checks that the indexed spell corrector (app.services.spell_index)
+returns the same corrections as SpellChecker.correction, and how much
+faster it is.
+
+Usage (from ai-service/):
+    python -m benchmarks.spell_parity [--words 300] [--seed 7]
+
+Exits with status 1 when a correction differs for a reason other than a
+frequency tie (SpellChecker breaks those in arbitrary set order).
+"""
+import argparse
+import random
+import sys
+import time
+
+from spellchecker import SpellChecker
+
+from app.core.config import SPELL_PREFIX_LENGTH
+from app.services.spell_index import SymmetricDeleteIndex
+
+
+# Typical OCR confusions on top of random edits
+OCR_SAMPLES = [
+    "algoritm", "databse", "recieve", "retreival", "infonnation", "systern",
+    "rnanagement", "cornputer", "netw0rk", "definitlon", "storaqe", "accesss",
+]
+
+
+def corrupt(word: str, rng: random.Random) -> str:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    chars = list(word)
+
+    for _ in range(rng.choice([1, 1, 2])):
+        op = rng.choice("drit")
+        i = rng.randrange(len(chars))
+        if op == "d" and len(chars) > 2:
+            del chars[i]
+        elif op == "r":
+            chars[i] = rng.choice(letters)
+        elif op == "i":
+            chars.insert(i, rng.choice(letters))
+        elif op == "t" and i < len(chars) - 1:
+            chars[i], chars[i + 1] = chars[i + 1], chars[i]
+
+    return "".join(chars)
+
+
+def build_corpus(spell: SpellChecker, size: int, seed: int) -> list:
+    rng = random.Random(seed)
+    words = sorted(w for w in spell.word_frequency.dictionary if w.isalpha() and 4 <= len(w) <= 12)
+    return [corrupt(w, rng) for w in rng.sample(words, size)] + OCR_SAMPLES
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    spell = SpellChecker()
+    corpus = build_corpus(spell, args.words, args.seed)
+
+    start = time.perf_counter()
+    index = SymmetricDeleteIndex(spell, prefix_length=SPELL_PREFIX_LENGTH)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = [spell.correction(w) for w in corpus]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = [index.correction(w) for w in corpus]
+    index_time = time.perf_counter() - start
+
+    ties, mismatches = [], []
+    for word, want, got in zip(corpus, expected, actual):
+        if want == got:
+            continue
+        if want and got and spell[want] == spell[got]:
+            ties.append((word, want, got))
+        else:
+            mismatches.append((word, want, got))
+
+    print(f"words:            {len(corpus)}")
+    print(f"index build:      {build_time:.2f}s")
+    print(f"SpellChecker:     {legacy_time / len(corpus) * 1000:.2f} ms/word")
+    print(f"indexed:          {index_time / len(corpus) * 1000:.2f} ms/word")
+    print(f"frequency ties:   {len(ties)}")
+    print(f"mismatches:       {len(mismatches)}")
+
+    for word, want, got in mismatches:
+        print(f"  {word!r}: expected {want!r}, got {got!r}")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
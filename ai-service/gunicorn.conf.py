@@ -0,0 +1,30 @@
+# Multi-worker deployment:
+#   gunicorn -c gunicorn.conf.py app.main:app
+#
+# preload_app imports the app in the master process, and on_starting
+# warms up the models there before any worker is forked, so all workers
+# share the loaded spaCy model / spell index copy-on-write instead of
+# each loading its own copy.
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "600"))
+preload_app = True
+
+
+def on_starting(server):
+    from app.core.warmup import warm_up
+
+    # Synchronous on purpose: no threads may be running when workers fork
+    warm_up()
+
+
+# Metrics: with several workers, set PROMETHEUS_MULTIPROC_DIR to an empty
+# directory so /metrics reports all of them, not just the one answering
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,66 @@
+import http.server
+import threading
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.services import gemini_refinement
+
+
+class _OkHandler(http.server.BaseHTTPRequestHandler):
+    # Keep-alive, so the second call reuses the pooled connection
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+class _FakeModels:
+    """Stands in for client.aio.models: one pooled httpx.AsyncClient shared by every call, like the real client."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.http = httpx.AsyncClient()
+
+    async def generate_content(self, model, contents, config):
+        response = await self.http.get(self.url)
+        response.raise_for_status()
+        text = contents[0].parts[0].text.split('"""')[1].upper()
+        part = SimpleNamespace(text=text)
+        candidate = SimpleNamespace(finish_reason="STOP", content=SimpleNamespace(parts=[part]))
+        return SimpleNamespace(candidates=[candidate])
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _OkHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    client = SimpleNamespace(aio=SimpleNamespace(models=_FakeModels(f"http://127.0.0.1:{server.server_port}/")))
+    monkeypatch.setattr(gemini_refinement, "ENABLE_LLM", True)
+    monkeypatch.setattr(gemini_refinement, "client", client)
+    monkeypatch.setattr(gemini_refinement, "_client_initialized", True)
+    monkeypatch.setattr(gemini_refinement, "breaker", gemini_refinement.CircuitBreaker(1, 60))
+
+    async def uncached(key, model, call):
+        return await call()
+
+    monkeypatch.setattr(gemini_refinement, "cached_llm_call_async", uncached)
+    yield
+    server.shutdown()
+
+
+def test_consecutive_calls_share_the_client(gemini):
+    texts = ["first document about photosynthesis", "second document about mitochondria"]
+
+    for text in texts:
+        assert gemini_refinement.refine_text_with_gemini(text) == text.upper()
+
+    assert not gemini_refinement.breaker.is_open()
@@ -0,0 +1,72 @@
+import os
+import threading
+import time
+
+from app.services import page_engine
+
+
+def _page(job):
+    seconds, pid_file = job
+    with open(pid_file, "w") as f:
+        f.write(str(os.getpid()))
+    time.sleep(seconds)
+    return os.getpid()
+
+
+def _alive(pid: int) -> bool:
+    """False once the process is gone or a zombie (killed, not yet reaped)."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+def test_timed_out_page_does_not_keep_its_worker(monkeypatch, tmp_path):
+    monkeypatch.setattr(page_engine, "get_worker_count", lambda: 2)
+    monkeypatch.setattr(page_engine, "OCR_PAGE_TIMEOUT", 1)
+    page_engine.reset_page_pool()
+
+    stuck_pid = tmp_path / "stuck.pid"
+    pages = [(60, str(stuck_pid)), (0, str(tmp_path / "a.pid")), (0, str(tmp_path / "b.pid"))]
+    try:
+        results = list(page_engine.map_pages(_page, pages))
+
+        assert results[0] == (None, "timeout")
+        assert all(error is None for _, error in results[1:])
+
+        pid = int(stuck_pid.read_text())
+        deadline = time.monotonic() + 5
+        while _alive(pid) and time.monotonic() < deadline:
+            time.sleep(0.1)
+        assert not _alive(pid)
+    finally:
+        page_engine.reset_page_pool()
+
+
+def test_other_documents_keep_their_pages_when_a_stuck_page_is_killed(monkeypatch, tmp_path):
+    monkeypatch.setattr(page_engine, "get_worker_count", lambda: 2)
+    monkeypatch.setattr(page_engine, "OCR_PAGE_TIMEOUT", 1)
+    page_engine.reset_page_pool()
+
+    results = {}
+
+    def run(name, pages):
+        results[name] = list(page_engine.map_pages(_page, pages))
+
+    stuck = threading.Thread(target=run, args=("stuck", [(60, str(tmp_path / "stuck.pid"))]))
+    other = threading.Thread(
+        target=run, args=("other", [(0.3, str(tmp_path / f"{i}.pid")) for i in range(6)])
+    )
+    try:
+        stuck.start()
+        time.sleep(0.1)
+        other.start()
+        stuck.join()
+        other.join()
+
+        assert results["stuck"] == [(None, "timeout")]
+        assert len(results["other"]) == 6
+        assert all(error is None for _, error in results["other"])
+    finally:
+        page_engine.reset_page_pool()